@@ -0,0 +1,73 @@
+"""Compares a `DetectionProfile` against full-resolution face detection.
+
+Frames are sampled once from each video, then both detectors run on the same
+frames. The script reports frames processed per second and how often the
+profile agrees with the full-resolution yes/no result.
+
+Usage: python benchmarks/face_detection.py VIDEO [VIDEO ...] --target-height 360
+"""
+
+import logging
+from time import perf_counter
+from argparse import ArgumentParser
+
+from open_video_summary.utils.config import ModelPaths
+from open_video_summary.utils.processing.video import VideoProcessor
+from open_video_summary.classifiers.image import CascadeFaceDetector, DetectionProfile
+
+
+def run(detector: CascadeFaceDetector, frames: list) -> tuple[list[bool], float]:
+    started = perf_counter()
+    detections = [detector.detect(frame) for frame in frames]
+    return detections, perf_counter() - started
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--fps", type=float, default=1)
+    parser.add_argument("--target-height", type=int, default=360)
+    parser.add_argument("--min-size", type=int, default=None)
+    parser.add_argument("--max-size", type=int, default=None)
+    parser.add_argument(
+        "--roi", type=float, nargs=4, default=None, metavar=("X", "Y", "W", "H")
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    full_resolution = CascadeFaceDetector(ModelPaths.FACE_CASCADE)
+    profiled = CascadeFaceDetector(
+        ModelPaths.FACE_CASCADE,
+        profile=DetectionProfile(
+            target_height=args.target_height,
+            min_size=(args.min_size, args.min_size) if args.min_size else None,
+            max_size=(args.max_size, args.max_size) if args.max_size else None,
+            roi=tuple(args.roi) if args.roi else None,
+        ),
+    )
+
+    print(
+        f"{'video':<40} {'frames':>7} {'full_fps':>9} {'profile_fps':>12} "
+        f"{'agreement':>10}"
+    )
+    for video_path in args.videos:
+        frames = VideoProcessor.retrieve_video_frames(
+            video_path, target_fps=args.fps, grayscale=True
+        )
+        full_detections, full_time = run(full_resolution, frames)
+        profile_detections, profile_time = run(profiled, frames)
+
+        agreement = sum(
+            full == profile
+            for full, profile in zip(full_detections, profile_detections)
+        ) / max(len(frames), 1)
+        print(
+            f"{video_path[-40:]:<40} {len(frames):>7} "
+            f"{len(frames) / max(full_time, 1e-9):>9.1f} "
+            f"{len(frames) / max(profile_time, 1e-9):>12.1f} {agreement:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compares linear and seek-based frame sampling in `VideoProcessor`.
+
+Usage: python benchmarks/frame_sampling.py VIDEO [VIDEO ...] --fps 1 --start 60 --end 90
+"""
+
+from time import perf_counter
+from argparse import ArgumentParser
+
+import cv2
+
+from open_video_summary.utils.processing import video as video_module
+from open_video_summary.utils.processing.video import VideoProcessor
+
+
+class CountingVideoCapture(cv2.VideoCapture):
+    decoded_frames = 0
+
+    def read(self, *args, **kwargs):
+        CountingVideoCapture.decoded_frames += 1
+        return super().read(*args, **kwargs)
+
+    def grab(self, *args, **kwargs):
+        CountingVideoCapture.decoded_frames += 1
+        return super().grab(*args, **kwargs)
+
+
+def run(video_path: str, seek: bool, fps: float, start: float, end: float | None):
+    CountingVideoCapture.decoded_frames = 0
+    started = perf_counter()
+    frames = VideoProcessor.retrieve_video_frames(
+        video_path,
+        target_fps=fps,
+        grayscale=True,
+        start_second=start,
+        end_second=end,
+        seek=seek,
+    )
+    return len(frames), CountingVideoCapture.decoded_frames, perf_counter() - started
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--fps", type=float, default=1)
+    parser.add_argument("--start", type=float, default=0)
+    parser.add_argument("--end", type=float, default=None)
+    args = parser.parse_args()
+
+    video_module.VideoCapture = CountingVideoCapture
+
+    print(f"{'video':<40} {'mode':<7} {'sampled':>8} {'decoded':>8} {'seconds':>9}")
+    for video_path in args.videos:
+        results = {}
+        for mode, seek in (("linear", False), ("seek", True)):
+            sampled, decoded, elapsed = run(
+                video_path, seek, args.fps, args.start, args.end
+            )
+            results[mode] = sampled
+            print(
+                f"{video_path[-40:]:<40} {mode:<7} {sampled:>8} {decoded:>8} {elapsed:>9.3f}"
+            )
+
+        if results["linear"] != results["seek"]:
+            print(
+                f"WARNING: modes sampled a different number of frames for {video_path}"
+            )
+
+
+if __name__ == "__main__":
+    main()
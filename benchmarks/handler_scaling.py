@@ -0,0 +1,72 @@
+"""Measures how `SummarySegmentHandler` operations scale with segment counts.
+
+Usage: python benchmarks/handler_scaling.py --segments 1000 2000 4000 8000
+"""
+
+import logging
+from time import perf_counter
+from argparse import ArgumentParser
+
+from open_video_summary.entities.video import Video, VideoSegment
+from open_video_summary.handlers.summary import SummarySegmentHandler
+
+
+def generate_videos(num_segments: int, num_videos: int = 5) -> list[Video]:
+    per_video = num_segments // num_videos
+    return [
+        Video(
+            name=f"video_{vid_index}",
+            path=f"video_{vid_index}.mp4",
+            segments=[
+                VideoSegment(
+                    content=f"Transcript of segment {order} " * 40,
+                    start=order * 10.0,
+                    end=order * 10.0 + 10,
+                    order=order,
+                )
+                for order in range(per_video)
+            ],
+        )
+        for vid_index in range(num_videos)
+    ]
+
+
+def timed(operation) -> float:
+    started = perf_counter()
+    operation()
+    return perf_counter() - started
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--segments", type=int, nargs="+", default=[1000, 2000, 4000, 8000]
+    )
+    args = parser.parse_args()
+
+    # Per-operation log lines would dominate the measured time
+    logging.disable(logging.INFO)
+
+    print(
+        f"{'segments':>9} {'set_source':>11} {'output':>9} {'discard':>9} "
+        f"{'filter_output':>14}"
+    )
+    for num_segments in args.segments:
+        videos = generate_videos(num_segments)
+        segments = [segment for video in videos for segment in video.segments]
+        handler = SummarySegmentHandler()
+
+        set_source = timed(lambda: handler.set_source_videos(videos))
+        output = timed(
+            lambda: [handler.add_output_segment(s, "bench") for s in segments[::2]]
+        )
+        discard = timed(lambda: [handler.discard_segment(s, "bench") for s in segments])
+        filter_output = timed(lambda: [s for s in segments if not handler.is_output(s)])
+        print(
+            f"{num_segments:>9} {set_source:>11.4f} {output:>9.4f} {discard:>9.4f} "
+            f"{filter_output:>14.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
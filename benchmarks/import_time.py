@@ -0,0 +1,52 @@
+"""Measures import time of the package entry points against a target budget.
+
+Each module is imported in a fresh interpreter, and the interpreter startup
+time is subtracted. The script exits with status 1 if any budget is exceeded.
+
+Usage: python benchmarks/import_time.py [--repeats 5]
+"""
+
+import sys
+from time import perf_counter
+from subprocess import run
+from statistics import median
+from argparse import ArgumentParser
+
+# Import budgets in seconds
+IMPORT_BUDGETS = {
+    "open_video_summary": 0.05,
+    "open_video_summary.core.summarizers": 1.5,
+    "open_video_summary.core.segmenter.video_segmenter": 0.5,
+}
+
+
+def time_import(statement: str, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = perf_counter()
+        run([sys.executable, "-c", statement], check=True)
+        timings.append(perf_counter() - started)
+    return median(timings)
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    startup = time_import("pass", args.repeats)
+    print(f"Interpreter startup: {startup:.3f}s")
+
+    exceeded = False
+    print(f"{'module':<52} {'seconds':>8} {'budget':>8}")
+    for module, budget in IMPORT_BUDGETS.items():
+        elapsed = max(time_import(f"import {module}", args.repeats) - startup, 0)
+        exceeded |= elapsed > budget
+        status = "" if elapsed <= budget else "  EXCEEDED"
+        print(f"{module:<52} {elapsed:>8.3f} {budget:>8.3f}{status}")
+
+    sys.exit(int(exceeded))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Measures `LLMAdapter.generate_pattern_many` against a local fake Ollama server.
+
+The fake server answers `/api/generate` after a fixed latency and echoes the
+prompt back, so the benchmark also checks that responses keep prompt order.
+
+Usage: python benchmarks/llm_concurrency.py --prompts 200 --concurrency 1 4 8
+"""
+
+import logging
+from time import perf_counter, sleep
+from json import dumps, loads
+from threading import Thread
+from typing import Callable
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from open_video_summary.adapters.llm import OllamaAdapter
+
+
+def echo_prompt(prompt: str) -> str:
+    return dumps({"prompt": prompt})
+
+
+def create_fake_ollama(
+    latency: Callable[[str], float], respond: Callable[[str], str] = echo_prompt
+) -> ThreadingHTTPServer:
+    """Serves `/api/generate`, sleeping `latency(prompt)` before answering."""
+
+    class FakeOllamaHandler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            request = loads(self.rfile.read(int(self.headers["Content-Length"])))
+            seconds = latency(request["prompt"])
+            sleep(seconds)
+
+            body = dumps(
+                {
+                    "model": request["model"],
+                    "response": respond(request["prompt"]),
+                    "done": True,
+                    "prompt_eval_count": len(request["prompt"]) // 4,
+                    "eval_count": 8,
+                    "eval_duration": int(seconds * 1e9),
+                }
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    return ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--prompts", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    server = create_fake_ollama(lambda prompt: args.latency)
+    Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+
+    prompts = [f"prompt {index}" for index in range(args.prompts)]
+    print(f"{'concurrency':>11} {'seconds':>8} {'prompts/s':>10} {'ordered':>8}")
+    for concurrency in args.concurrency:
+        adapter = OllamaAdapter(host=host, max_concurrency=concurrency)
+
+        started = perf_counter()
+        responses = adapter.generate_pattern_many(prompts, pattern=r"(\{.*?\})")
+        elapsed = perf_counter() - started
+
+        ordered = [loads(response)["prompt"] for response in responses] == prompts
+        print(
+            f"{concurrency:>11} {elapsed:>8.2f} {len(prompts) / elapsed:>10.1f} "
+            f"{str(ordered):>8}"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Compares exact and LSH candidate search in `ContentBasedRedundancy`.
+
+A synthetic corpus is generated with faker: every video tells a random subset
+of shared stories, each with its own noisy wording, so redundant segments
+exist across videos. Recall is measured over the above-threshold pairs and
+over the final redundancies found by the exact search.
+
+Usage: python benchmarks/redundancy_ann.py --videos 10 20 40 --segments 100
+"""
+
+import logging
+from random import Random
+from warnings import simplefilter
+from time import perf_counter
+from argparse import ArgumentParser
+
+from faker import Faker
+
+from open_video_summary.entities.video import Video, VideoSegment
+from open_video_summary.core.selection_criteria.redundancy import (
+    ContentBasedRedundancy,
+)
+
+
+def generate_videos(num_videos: int, num_segments: int, seed: int) -> list[Video]:
+    fake, rng = Faker(), Random(seed)
+    Faker.seed(seed)
+
+    stories = [fake.paragraph(nb_sentences=4) for _ in range(num_segments * 2)]
+    videos = []
+    for vid_index in range(num_videos):
+        segments = []
+        for order, story in enumerate(rng.sample(stories, num_segments)):
+            words = story.split()
+            kept = [word for word in words if rng.random() > 0.3]
+            content = " ".join(kept + fake.words(nb=len(words) // 3))
+            segments.append(
+                VideoSegment(
+                    content=content,
+                    start=order * 10.0,
+                    end=order * 10.0 + 10,
+                    order=order,
+                )
+            )
+        videos.append(
+            Video(
+                name=f"video_{vid_index}",
+                path=f"video_{vid_index}.mp4",
+                segments=segments,
+            )
+        )
+    return videos
+
+
+def run(criteria: ContentBasedRedundancy, videos: list[Video], threshold: float):
+    started = perf_counter()
+    tfidf_matrix = criteria.get_tfidf_matrix(videos)
+    correlations = criteria.get_correlations_df(
+        tfidf_matrix, videos, threshold=threshold
+    )
+    redundancies = criteria.get_redundancies(correlations)
+    elapsed = perf_counter() - started
+
+    pairs = set(
+        correlations[
+            ["video_index", "segment_index", "video_index_col", "segment_index_col"]
+        ].itertuples(index=False, name=None)
+    )
+    return elapsed, pairs, {tuple(map(tuple, item)) for item in redundancies}
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--videos", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--segments", type=int, default=100)
+    parser.add_argument("--lsh-rows", type=int, default=3)
+    parser.add_argument("--lsh-bands", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    # The criteria's duration-scaled threshold exceeds 1 on large synthetic sets
+    parser.add_argument("--threshold", type=float, default=0.17)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    simplefilter("ignore")
+
+    exact = ContentBasedRedundancy(candidate_search="exact")
+    lsh = ContentBasedRedundancy(
+        candidate_search="lsh",
+        lsh_rows=args.lsh_rows,
+        lsh_bands=args.lsh_bands,
+        random_state=args.seed,
+    )
+
+    print(
+        f"{'videos':>6} {'segments':>9} {'exact_s':>8} {'lsh_s':>8} "
+        f"{'pair_recall':>12} {'redundancy_recall':>18}"
+    )
+    for num_videos in args.videos:
+        videos = generate_videos(num_videos, args.segments, args.seed)
+        exact_time, exact_pairs, exact_redundancies = run(exact, videos, args.threshold)
+        lsh_time, lsh_pairs, lsh_redundancies = run(lsh, videos, args.threshold)
+
+        pair_recall = len(exact_pairs & lsh_pairs) / max(len(exact_pairs), 1)
+        redundancy_recall = len(exact_redundancies & lsh_redundancies) / max(
+            len(exact_redundancies), 1
+        )
+        print(
+            f"{num_videos:>6} {num_videos * args.segments:>9} {exact_time:>8.3f} "
+            f"{lsh_time:>8.3f} {pair_recall:>12.3f} {redundancy_recall:>18.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
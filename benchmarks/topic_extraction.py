@@ -0,0 +1,92 @@
+"""Compares single-prompt and hierarchical topic extraction in `VideoSegmenter`.
+
+Runs against the fake Ollama server of `llm_concurrency.py`. Its latency grows
+quadratically with the prompt length, like prompt evaluation with full
+attention. Total LLM time is summed from the adapter's metrics hook.
+
+Usage: python -m benchmarks.topic_extraction --words 2000 8000 32000
+"""
+
+import logging
+from json import dumps
+from threading import Lock, Thread
+from time import perf_counter
+from argparse import ArgumentParser
+
+from faker import Faker
+
+from benchmarks.llm_concurrency import create_fake_ollama
+from open_video_summary.adapters.llm import LLMCallMetrics, OllamaAdapter
+from open_video_summary.core.segmenter.video_segmenter import VideoSegmenter
+
+
+class LLMTimer:
+    def __init__(self) -> None:
+        self.seconds, self.calls = 0.0, 0
+        self.__lock = Lock()
+
+    def __call__(self, metrics: LLMCallMetrics) -> None:
+        with self.__lock:
+            self.seconds += metrics.latency_seconds
+            self.calls += 1
+
+
+def fake_topics(prompt: str) -> str:
+    return dumps({str(index): f"Topic {index}" for index in range(5)})
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, nargs="+", default=[2000, 8000, 32000])
+    parser.add_argument("--chunk-tokens", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--seconds-per-ktoken", type=float, default=0.05, help="Latency at 1k tokens"
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    def latency(prompt: str) -> float:
+        return args.seconds_per_ktoken * (len(prompt) / 4 / 1000) ** 2
+
+    server = create_fake_ollama(latency, respond=fake_topics)
+    Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+
+    fake = Faker()
+    Faker.seed(0)
+    print(
+        f"{'words':>7} {'mode':>13} {'calls':>6} {'llm_seconds':>12} "
+        f"{'wall_seconds':>13}"
+    )
+    for num_words in args.words:
+        document = " ".join(fake.sentence() for _ in range(num_words // 8))
+        for mode in ("single", "hierarchical"):
+            timer = LLMTimer()
+            segmenter = VideoSegmenter(
+                llm_adapter=OllamaAdapter(
+                    host=host, max_concurrency=args.concurrency, metrics_hook=timer
+                ),
+                topic_extraction=mode,
+                topic_chunk_tokens=args.chunk_tokens,
+            )
+            extract = (
+                segmenter.extract_topics_hierarchically
+                if mode == "hierarchical"
+                else segmenter.extract_topics
+            )
+
+            started = perf_counter()
+            extract(document, max_subtopics=10)
+            wall_seconds = perf_counter() - started
+            print(
+                f"{num_words:>7} {mode:>13} {timer.calls:>6} {timer.seconds:>12.2f} "
+                f"{wall_seconds:>13.2f}"
+            )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
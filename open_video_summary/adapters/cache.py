@@ -0,0 +1,125 @@
+from json import dumps
+from time import time
+from pathlib import Path
+from typing import Optional
+from hashlib import sha256
+from threading import Lock
+from sqlite3 import connect
+
+from open_video_summary.adapters.llm import LLMAdapter
+
+
+class CachedLLMAdapter(LLMAdapter):
+    """Memoizes the responses of any `LLMAdapter` in a SQLite database.
+
+    Responses are keyed by model, prompt, generation options and extraction
+    pattern. Entries older than `ttl_seconds` are treated as misses, and the least
+    recently used ones are evicted past `max_entries`.
+    """
+
+    def __init__(
+        self,
+        adapter: LLMAdapter,
+        path: str = ":memory:",
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ) -> None:
+        self.adapter = adapter
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        # Shared by the threads of `generate_pattern_many`, guarded by the lock
+        self.__connection = connect(path, check_same_thread=False)
+        self.__lock = Lock()
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+
+    @property
+    def max_concurrency(self) -> int:  # type: ignore[override]
+        return self.adapter.max_concurrency
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+
+    def key(self, prompt: str, pattern: str, **kwargs) -> str:
+        content = dumps(
+            {
+                "model": getattr(self.adapter, "model", type(self.adapter).__name__),
+                "prompt": prompt,
+                "pattern": pattern,
+                "options": kwargs,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return sha256(content.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time()
+        with self.__lock, self.__connection:
+            row = self.__connection.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self.__connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            self.__connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            return response
+
+    def put(self, key: str, response: str) -> None:
+        now = time()
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            if self.max_entries is not None:
+                self.__connection.execute(
+                    "DELETE FROM responses WHERE key NOT IN ("
+                    "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+
+    def clear(self) -> None:
+        with self.__lock, self.__connection:
+            self.__connection.execute("DELETE FROM responses")
+        self.hits, self.misses = 0, 0
+
+    def generate_pattern(self, prompt: str, pattern: str, **kwargs) -> str:
+        key = self.key(prompt, pattern, **kwargs)
+        response = self.get(key)
+        if response is not None:
+            return response
+
+        # Failed calls raise before reaching the cache, they are retried next time
+        response = self.adapter.generate_pattern(prompt, pattern, **kwargs)
+        self.put(key, response)
+        return response
@@ -1,33 +1,197 @@
-import ollama
+from random import random
 from re import DOTALL, search
+from asyncio import to_thread
+from time import monotonic, sleep
+from dataclasses import dataclass
+from typing import Callable, Optional
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+from open_video_summary.utils import log
+from open_video_summary.utils.lazy import LazyModel
+
+
+class LLMPatternNotFoundError(ValueError):
+    """Raised when no LLM response matched the extraction pattern."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Bounds the retries of a LLM call and spaces them with exponential backoff.
+
+    Errors and responses not matching the extraction pattern are counted apart.
+    The n-th retry waits `backoff_seconds * backoff_factor ** (n - 1)` seconds,
+    capped at `max_backoff_seconds` and reduced by up to `jitter` of itself.
+    No attempt starts once `deadline_seconds` have passed since the call began.
+    A running request isn't interrupted at the deadline, it's only bounded by
+    the client timeout, so a call can take up to about twice `deadline_seconds`.
+    """
+
+    max_attempts: int = 3
+    max_pattern_misses: int = 3
+    backoff_seconds: float = 3
+    backoff_factor: float = 2
+    max_backoff_seconds: float = 60
+    jitter: float = 0.5
+    deadline_seconds: Optional[float] = None
+
+    def delay(self, retry: int) -> float:
+        delay = min(
+            self.backoff_seconds * self.backoff_factor ** (retry - 1),
+            self.max_backoff_seconds,
+        )
+        return delay * (1 - self.jitter * random())
+
+
+@dataclass
+class LLMCallMetrics:
+    model: str
+    latency_seconds: float
+    attempts: int
+    errors: int
+    pattern_misses: int
+    prompt_eval_count: int
+    eval_count: int
+    eval_duration_seconds: float
+    succeeded: bool
+
+    @property
+    def tokens_per_second(self) -> float:
+        if not self.eval_duration_seconds:
+            return 0.0
+        return self.eval_count / self.eval_duration_seconds
 
 
 class LLMAdapter:
+    max_concurrency: int = 1
+
     @abstractmethod
     def generate_pattern(self, prompt: str, pattern: str, **kwargs) -> str:
         pass
 
+    def generate_pattern_many(
+        self,
+        prompts: list[str],
+        pattern: str,
+        defaults: Optional[list[str]] = None,
+        **kwargs,
+    ) -> list[str]:
+        """Runs independent prompts on up to `max_concurrency` threads, in order.
+
+        With `defaults`, a prompt whose responses never match the pattern gets its
+        default instead of raising `LLMPatternNotFoundError`.
+        """
+
+        def generate(index: int) -> str:
+            try:
+                return self.generate_pattern(prompts[index], pattern, **kwargs)
+            except LLMPatternNotFoundError:
+                if defaults is None:
+                    raise
+                log.warning(f"Using the default response for prompt {index}.")
+                return defaults[index]
+
+        if self.max_concurrency <= 1 or len(prompts) <= 1:
+            return [generate(index) for index in range(len(prompts))]
+
+        workers = min(self.max_concurrency, len(prompts))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(generate, range(len(prompts))))
+
+    async def agenerate_pattern(self, prompt: str, pattern: str, **kwargs) -> str:
+        return await to_thread(self.generate_pattern, prompt, pattern, **kwargs)
+
+
 class OllamaAdapter(LLMAdapter):
     def __init__(
-        self, model: str = "gemma2", max_attempts: int = 3, attempts_interval: int = 3
+        self,
+        model: str = "gemma2",
+        max_attempts: int = 3,
+        attempts_interval: int = 3,
+        host: Optional[str] = None,
+        max_concurrency: int = 1,
+        retry_policy: Optional[RetryPolicy] = None,
+        metrics_hook: Optional[Callable[[LLMCallMetrics], None]] = None,
     ) -> None:
         self.model = model
         self.max_attempts = max_attempts
         self.attempts_interval = attempts_interval
+        self.host = host
+        self.max_concurrency = max_concurrency
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_attempts=max_attempts,
+            max_pattern_misses=max_attempts,
+            backoff_seconds=attempts_interval,
+        )
+        self.metrics_hook = metrics_hook
+        self.client = LazyModel(self.create_client)
+
+    def create_client(self):
+        import ollama
+
+        # Bounds each request on its own, a retry started late can outlive the deadline
+        return ollama.Client(host=self.host, timeout=self.retry_policy.deadline_seconds)
 
     def generate_pattern(self, prompt: str, pattern: str, **kwargs) -> str:
-        attempt = 0
-        while attempt < self.max_attempts:
+        policy = self.retry_policy
+        started = monotonic()
+        deadline = (
+            started + policy.deadline_seconds
+            if policy.deadline_seconds is not None
+            else None
+        )
+        errors, misses, prompt_tokens, tokens, eval_seconds = 0, 0, 0, 0, 0.0
+        result, error = None, None
+
+        while True:
             try:
-                response = ollama.generate(
+                response = self.client.get().generate(
                     model=self.model, prompt=prompt, **kwargs
-                ).get("response")
-                result = search(pattern, response, flags=DOTALL)
+                )
+                prompt_tokens += response.get("prompt_eval_count") or 0
+                tokens += response.get("eval_count") or 0
+                eval_seconds += (response.get("eval_duration") or 0) / 1e9
+
+                result = search(pattern, response.get("response"), flags=DOTALL)
                 if result is not None:
-                    return result.group(0)
+                    break
+                misses += 1
             except Exception as e:
-                attempt += 1
-                if attempt == self.max_attempts:
-                    raise e
-        return ""
\ No newline at end of file
+                errors += 1
+                error = e
+
+            if errors >= policy.max_attempts or misses >= policy.max_pattern_misses:
+                break
+
+            delay = policy.delay(errors + misses)
+            if deadline is not None and monotonic() + delay >= deadline:
+                log.warning(f"LLM call deadline reached after {errors + misses} tries.")
+                break
+            sleep(delay)
+
+        if self.metrics_hook is not None:
+            self.metrics_hook(
+                LLMCallMetrics(
+                    model=self.model,
+                    latency_seconds=monotonic() - started,
+                    attempts=errors + misses + (result is not None),
+                    errors=errors,
+                    pattern_misses=misses,
+                    prompt_eval_count=prompt_tokens,
+                    eval_count=tokens,
+                    eval_duration_seconds=eval_seconds,
+                    succeeded=result is not None,
+                )
+            )
+
+        if result is not None:
+            return result.group(0)
+        if errors >= policy.max_attempts and error is not None:
+            raise error
+        if deadline is not None and misses < policy.max_pattern_misses:
+            raise TimeoutError(
+                f"LLM call exceeded its {policy.deadline_seconds}s deadline."
+            ) from error
+        raise LLMPatternNotFoundError(
+            f"No LLM response matched {pattern!r} after {misses} tries."
+        )
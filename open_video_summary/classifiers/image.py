@@ -1,6 +1,28 @@
+from typing import Iterable, Optional
 from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
 
-from cv2 import CascadeClassifier
+from cv2 import CascadeClassifier, INTER_AREA, resize
+
+from open_video_summary.utils.lazy import LazyModel
+
+
+@dataclass(frozen=True)
+class DetectionProfile:
+    scale_factor: float = 1.1
+    min_neighbors: int = 5
+    target_height: Optional[int] = None
+    min_size: Optional[tuple[int, int]] = None
+    max_size: Optional[tuple[int, int]] = None
+    roi: Optional[tuple[float, float, float, float]] = None
+
+    def __post_init__(self) -> None:
+        if self.roi is not None:
+            x, y, width, height = self.roi
+            if not (0 <= x < 1 and 0 <= y < 1 and 0 < width and 0 < height):
+                raise ValueError("The `roi` must be fractions of the frame size.")
+            if x + width > 1 or y + height > 1:
+                raise ValueError("The `roi` must be within the frame.")
 
 
 class ObjectDetector(ABC):
@@ -8,11 +30,72 @@ class ObjectDetector(ABC):
     def detect(self, frame) -> bool:
         ...
 
+    def detect_any(self, frames: Iterable) -> bool:
+        # Stops at the first frame containing the object
+        return any(map(self.detect, frames))
+
 
 class CascadeFaceDetector(ObjectDetector):
-    def __init__(self, classifier_path: str) -> None:
-        self.classifier = CascadeClassifier(classifier_path)
+    def __init__(
+        self, classifier_path: str, profile: Optional[DetectionProfile] = None
+    ) -> None:
+        self._load(classifier_path, profile or DetectionProfile())
+
+    def _load(self, classifier_path: str, profile: DetectionProfile) -> None:
+        self.classifier_path = classifier_path
+        self.profile = profile
+        self.__classifier = LazyModel(lambda: CascadeClassifier(classifier_path))
+
+    @property
+    def classifier(self) -> CascadeClassifier:
+        return self.__classifier.get()
+
+    def __getstate__(self) -> dict:
+        # OpenCV classifiers can't be pickled, worker processes load it again
+        return {
+            "classifier_path": self.classifier_path,
+            "profile": asdict(self.profile),
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self._load(state["classifier_path"], DetectionProfile(**state["profile"]))
 
     def detect(self, frame) -> bool:
-        faces = self.classifier.detectMultiScale(frame, scaleFactor=1.1, minNeighbors=5)
+        frame, scale = self.downscale(self.crop(frame))
+
+        # Face size bounds are given for full-resolution frames, (0, 0) is no bound
+        faces = self.classifier.detectMultiScale(
+            frame,
+            scaleFactor=self.profile.scale_factor,
+            minNeighbors=self.profile.min_neighbors,
+            minSize=self.scaled_size(self.profile.min_size, scale),
+            maxSize=self.scaled_size(self.profile.max_size, scale),
+        )
         return bool(len(faces))
+
+    def crop(self, frame):
+        if self.profile.roi is None:
+            return frame
+
+        height, width = frame.shape[:2]
+        x, y, roi_width, roi_height = self.profile.roi
+        top, left = int(y * height), int(x * width)
+        bottom = max(round((y + roi_height) * height), top + 1)
+        right = max(round((x + roi_width) * width), left + 1)
+        return frame[top:bottom, left:right]
+
+    def downscale(self, frame) -> tuple:
+        height = frame.shape[0]
+        target_height = self.profile.target_height
+        if target_height is None or height <= target_height:
+            return frame, 1.0
+
+        scale = target_height / height
+        width = max(round(frame.shape[1] * scale), 1)
+        return resize(frame, (width, target_height), interpolation=INTER_AREA), scale
+
+    @staticmethod
+    def scaled_size(size: Optional[tuple[int, int]], scale: float) -> tuple[int, int]:
+        if size is None:
+            return (0, 0)
+        return (max(round(size[0] * scale), 1), max(round(size[1] * scale), 1))
@@ -1,8 +1,15 @@
-from numpy import argmax
+from __future__ import annotations
+
+from numpy import arange, argmax, argmin, asarray, logspace, ndarray
 from abc import ABC, abstractmethod
-from tensorflow import convert_to_tensor
-from sentence_transformers import CrossEncoder
-from tensorflow.keras.activations import softmax  # type: ignore
+from typing import TYPE_CHECKING, Optional
+
+from open_video_summary.utils import log
+from open_video_summary.utils.lazy import LazyModel
+from open_video_summary.utils.helpers import log_softmax, softmax
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
 
 
 class BinaryTextClassifier(ABC):
@@ -16,30 +23,67 @@ class BinaryTextClassifier(ABC):
 
 
 class TransformersSubjectivityClassifier(BinaryTextClassifier):
-    def __init__(self, model_path: str) -> None:
-        self.classifier = CrossEncoder(model_path, num_labels=2)
+    def __init__(self, model_path: str, temperature: float = 1.0) -> None:
+        self.model_path = model_path
+        self.temperature = temperature
+        self.__classifier = LazyModel(self.load_classifier)
+
+    @property
+    def classifier(self) -> CrossEncoder:
+        return self.__classifier.get()
+
+    def load_classifier(self) -> CrossEncoder:
+        # Importing sentence-transformers pulls torch, so it's deferred to first use
+        from sentence_transformers import CrossEncoder
+
+        return CrossEncoder(self.model_path, num_labels=2)
+
+    def predict_logits(self, content_list: list[str]) -> ndarray:
+        return asarray(self.classifier.predict([[item] for item in content_list]))
+
+    def predict_probabilities(self, content_list: list[str]) -> ndarray:
+        """Temperature-scaled class probabilities, one row per content.
+
+        They are calibrated only after `fit_temperature` has been run on held-out
+        data, the default temperature of 1 leaves the model's softmax unchanged.
+        """
+        if not content_list:
+            return asarray([])
+        return softmax(self.predict_logits(content_list) / self.temperature, axis=1)
+
+    def fit_temperature(
+        self,
+        content_list: list[str],
+        labels: list[bool],
+        candidates: Optional[ndarray] = None,
+    ) -> float:
+        """Calibrates `temperature` on held-out labelled contents.
+
+        Picks the candidate temperature with the lowest negative log-likelihood of
+        the labels. Scaling the logits never changes the predicted classes.
+        """
+        if not content_list:
+            raise ValueError("Temperature fitting needs at least one labelled content.")
+
+        candidates = logspace(-1, 1, 201) if candidates is None else candidates
+        logits = self.predict_logits(content_list)
+        rows, targets = arange(len(labels)), asarray(labels, dtype=int)
+
+        losses = [
+            -log_softmax(logits / temperature, axis=1)[rows, targets].mean()
+            for temperature in candidates
+        ]
+        self.temperature = float(candidates[argmin(losses)])
+
+        log.info(f"Fitted subjectivity classifier temperature {self.temperature:.3f}.")
+        return self.temperature
 
     def classify(self, content: str) -> bool:
-        return bool(
-            argmax(
-                softmax(
-                    convert_to_tensor(self.classifier.predict([[content]]))
-                ).numpy(),
-                axis=1,
-            )[0]
-        )
+        return self.classify_list([content])[0]
 
     def classify_list(self, content_list: list[str]) -> list[bool]:
-        return list(
-            map(
-                bool,
-                argmax(
-                    softmax(
-                        convert_to_tensor(
-                            self.classifier.predict([[item] for item in content_list])
-                        )
-                    ).numpy(),
-                    axis=1,
-                ),
-            )
-        )
+        if not content_list:
+            return []
+
+        # Softmax is monotonic, so the argmax of the logits is the predicted class
+        return list(map(bool, argmax(self.predict_logits(content_list), axis=1)))
@@ -25,6 +25,28 @@ class VideoSegmenterPrompts:
         """
     )
 
+    merge_subtopics: str = field(
+        default="""
+            @CANDIDATES
+            {candidate_topics}
+
+            #####
+
+            @OUTPUT
+
+            The output should be a JSON object with the following example format
+            {{
+                "0": "Example topic",
+                "1": "Another topic example",
+                "2": ...
+            }}
+
+            #####
+
+            The @CANDIDATES were extracted from consecutive parts of the same video transcript and may repeat or overlap. Merge the duplicated and overlapping ones into up to {max_subtopics} subtopics covering the whole video. The response should contain only the subtopics using the @OUTPUT format specified.
+        """
+    )
+
     classify_subtopic: str = field(
         default="""
             @DOCUMENT
@@ -83,6 +105,14 @@ class VideoSegmenterPrompts:
                 "The prompt template for `generate_subtopics` must contain both a '{full_video_transcript}' and '{max_subtopics}' placeholders."
             )
 
+        if (
+            "{candidate_topics}" not in self.merge_subtopics
+            or "{max_subtopics}" not in self.merge_subtopics
+        ):
+            raise ValueError(
+                "The prompt template for `merge_subtopics` must contain both a '{candidate_topics}' and '{max_subtopics}' placeholders."
+            )
+
         if (
             "{content}" not in self.classify_subtopic
             or "{topics}" not in self.classify_subtopic
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from json import JSONDecodeError, dumps, loads
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Optional
+
+from numpy import argsort, asarray, ndarray
+
+from open_video_summary.utils import log
+from open_video_summary.utils.lazy import LazyModel
+from open_video_summary.adapters.llm import LLMAdapter, LLMPatternNotFoundError
+from open_video_summary.core.segmenter.prompts import VideoSegmenterPrompts
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+
+class TopicClassifier(ABC):
+    @abstractmethod
+    def classify(self, contents: list[str], topics: dict[str, str]) -> list[str]:
+        """Returns the key in `topics` that best describes each content."""
+        ...
+
+
+class LLMTopicClassifier(TopicClassifier):
+    def __init__(
+        self, llm_adapter: LLMAdapter, prompts_template: VideoSegmenterPrompts
+    ) -> None:
+        self.llm_adapter = llm_adapter
+        self.prompts_template = prompts_template
+
+    def classify(
+        self,
+        contents: list[str],
+        topics: dict[str, str],
+        defaults: Optional[list[str]] = None,
+    ) -> list[str]:
+        """Contents without a matching response get their topic from `defaults`,
+        or raise `LLMPatternNotFoundError` when not given."""
+        # Contents are classified independently, so all prompts are sent at once
+        responses = self.llm_adapter.generate_pattern_many(
+            [
+                self.prompts_template.classify_subtopic.format(
+                    content=content, topics=topics
+                )
+                for content in contents
+            ],
+            pattern=r"(\{.*?\})",
+            defaults=(
+                [dumps({topic_id: topics[topic_id]}) for topic_id in defaults]
+                if defaults is not None
+                else None
+            ),
+            options={"format": "json", "temperature": 0.2},
+        )
+
+        topic_ids = []
+        for index, topics_str in enumerate(responses):
+            topic_id = self.parse_topic_id(topics_str, topics)
+            if topic_id is None:
+                if defaults is None:
+                    raise LLMPatternNotFoundError(
+                        f"No known topic in LLM response {topics_str!r}."
+                    )
+                log.warning(f"No known topic in LLM response for content {index}.")
+                topic_id = defaults[index]
+            topic_ids.append(topic_id)
+        return topic_ids
+
+    @staticmethod
+    def parse_topic_id(response: str, topics: dict[str, str]) -> Optional[str]:
+        try:
+            answer = loads(response)
+        except JSONDecodeError:
+            return None
+
+        if not isinstance(answer, dict) or not answer:
+            return None
+        topic_id, _ = answer.popitem()
+        return topic_id if topic_id in topics else None
+
+
+class EmbeddingTopicClassifier(TopicClassifier):
+    """Assigns each content to the topic with the most similar sentence embedding."""
+
+    def __init__(
+        self,
+        model_path: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+        batch_size: int = 64,
+    ) -> None:
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.__encoder = LazyModel(self.load_encoder)
+
+    @property
+    def encoder(self) -> SentenceTransformer:
+        return self.__encoder.get()
+
+    def load_encoder(self) -> SentenceTransformer:
+        # Importing sentence-transformers pulls torch, so it's deferred to first use
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(self.model_path)
+
+    def encode(self, texts: list[str]) -> ndarray:
+        return asarray(
+            self.encoder.encode(
+                texts, batch_size=self.batch_size, normalize_embeddings=True
+            )
+        )
+
+    def similarities(self, contents: list[str], topics: dict[str, str]) -> ndarray:
+        """Cosine similarity of every content (rows) to every topic (columns)."""
+        log.info(f"Encoding {len(contents)} contents and {len(topics)} topics.")
+        embeddings = self.encode(contents + list(topics.values()))
+        return embeddings[: len(contents)] @ embeddings[len(contents) :].T
+
+    def classify(self, contents: list[str], topics: dict[str, str]) -> list[str]:
+        if not contents:
+            return []
+
+        topic_ids = list(topics.keys())
+        return [
+            topic_ids[index]
+            for index in self.similarities(contents, topics).argmax(axis=1)
+        ]
+
+
+class HybridTopicClassifier(TopicClassifier):
+    """Embedding classification, deferring to the LLM when the top topics are close.
+
+    A content goes to the LLM when the similarity margin between its two most
+    similar topics is below `min_margin`.
+    """
+
+    def __init__(
+        self,
+        embedding_classifier: EmbeddingTopicClassifier,
+        llm_classifier: LLMTopicClassifier,
+        min_margin: float = 0.05,
+    ) -> None:
+        self.embedding_classifier = embedding_classifier
+        self.llm_classifier = llm_classifier
+        self.min_margin = min_margin
+
+    def classify(self, contents: list[str], topics: dict[str, str]) -> list[str]:
+        if not contents:
+            return []
+
+        topic_ids = list(topics.keys())
+        similarities = self.embedding_classifier.similarities(contents, topics)
+        ranking = argsort(-similarities, axis=1)
+        labels = [topic_ids[index] for index in ranking[:, 0]]
+
+        if len(topic_ids) < 2:
+            return labels
+
+        rows = range(len(contents))
+        margins = similarities[rows, ranking[:, 0]] - similarities[rows, ranking[:, 1]]
+        ambiguous = (margins < self.min_margin).nonzero()[0]
+        log.info(
+            f"Classifying {len(ambiguous)} of {len(contents)} low-margin contents "
+            "with the LLM."
+        )
+
+        # Embedding labels are kept for contents the LLM couldn't classify
+        llm_labels = self.llm_classifier.classify(
+            [contents[index] for index in ambiguous],
+            topics,
+            defaults=[labels[index] for index in ambiguous],
+        )
+        for index, label in zip(ambiguous, llm_labels):
+            labels[index] = label
+        return labels
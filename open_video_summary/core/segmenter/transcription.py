@@ -0,0 +1,218 @@
+from json import dump, load
+from pathlib import Path
+from hashlib import sha256
+from typing import Optional
+from functools import partial
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+from numpy import convolve, ndarray, ones, sqrt
+
+from open_video_summary.utils import log
+from open_video_summary.utils.lazy import LazyModel
+
+# Whisper models loaded by each transcription worker process
+worker_models: dict[str, object] = {}
+
+# Whisper's `seek` counts mel spectrogram frames, 10ms each
+SEEK_FRAMES_PER_SECOND = 100
+
+
+class TranscriptCache:
+    """On-disk Whisper transcripts, addressed by audio content, model and language.
+
+    Keys hash the file bytes instead of its path, so a renamed or copied video
+    still hits the cache and an edited one is transcribed again.
+    """
+
+    def __init__(self, cache_dir: str, chunk_size: int = 1 << 20) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.chunk_size = chunk_size
+
+    def file_digest(self, video_path: str) -> str:
+        digest = sha256()
+        with open(video_path, "rb") as video_file:
+            while chunk := video_file.read(self.chunk_size):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def key(self, video_path: str, model: str, language: str) -> str:
+        digest = sha256(f"{self.file_digest(video_path)}:{model}:{language}".encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self.path(key)
+        if not path.exists():
+            return None
+
+        log.info(f"Loading cached transcript {path.name}.")
+        with open(path, encoding="utf-8") as cache_file:
+            return load(cache_file)
+
+    def put(self, key: str, transcript: dict) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+
+        # Written next to the target and renamed, so readers never see partial files
+        partial_path = path.with_suffix(".partial")
+        with open(partial_path, "w", encoding="utf-8") as cache_file:
+            dump(transcript, cache_file, ensure_ascii=False)
+        partial_path.replace(path)
+        log.info(f"Saved transcript to cache as {path.name}.")
+
+
+class ChunkedTranscriber:
+    """Transcribes long audio in windows cut at silences, across worker processes.
+
+    Windows are at most `chunk_seconds` long. Each cut is placed at the quietest
+    `min_silence_seconds` stretch (by RMS energy) within the last
+    `search_seconds` of the window, so words are rarely split. Chunk transcripts
+    are stitched back into a single Whisper result with corrected timestamps.
+    """
+
+    def __init__(
+        self,
+        whisper_model: str,
+        chunk_seconds: float = 600,
+        max_workers: int = 1,
+        search_seconds: float = 30,
+        min_silence_seconds: float = 0.3,
+        frame_seconds: float = 0.02,
+        sample_rate: int = 16000,
+    ) -> None:
+        if search_seconds >= chunk_seconds:
+            raise ValueError(
+                f"The `chunk_seconds` must be greater than `search_seconds` "
+                f"({search_seconds})."
+            )
+
+        self.whisper_model = whisper_model
+        self.chunk_seconds = chunk_seconds
+        self.max_workers = max_workers
+        self.search_seconds = search_seconds
+        self.min_silence_seconds = min_silence_seconds
+        self.frame_seconds = frame_seconds
+        self.sample_rate = sample_rate
+
+    def split_audio(self, audio: ndarray) -> list[tuple[int, int]]:
+        frame_size = int(self.sample_rate * self.frame_seconds)
+        num_frames = len(audio) // frame_size
+        frames = audio[: num_frames * frame_size].reshape(num_frames, frame_size)
+        energy = sqrt((frames**2).mean(axis=1))
+
+        # Mean energy of the `min_silence_seconds` stretch centered on each frame
+        silence_frames = max(int(self.min_silence_seconds / self.frame_seconds), 1)
+        energy = convolve(energy, ones(silence_frames) / silence_frames, mode="same")
+
+        chunk_frames = int(self.chunk_seconds / self.frame_seconds)
+        search_frames = int(self.search_seconds / self.frame_seconds)
+
+        bounds, start = [], 0
+        while num_frames - start > chunk_frames:
+            search_start = start + chunk_frames - search_frames
+            cut = search_start + int(
+                energy[search_start : start + chunk_frames].argmin()
+            )
+            bounds.append((start * frame_size, cut * frame_size))
+            start = cut
+
+        bounds.append((start * frame_size, len(audio)))
+        return bounds
+
+    def transcribe(
+        self, audio: ndarray, language: str, model: Optional[LazyModel] = None
+    ) -> dict:
+        """Transcribes `audio`, serially with `model` when it's given and there's
+        a single chunk or worker, otherwise in worker processes."""
+        bounds = self.split_audio(audio)
+        chunks = [audio[start:end] for start, end in bounds]
+        offsets = [start / self.sample_rate for start, _ in bounds]
+
+        if self.max_workers <= 1 or len(chunks) == 1:
+            log.info(f"Transcribing {len(chunks)} audio chunks serially.")
+
+            # A single chunk doesn't need worker processes nor their model copies
+            loaded = model.get() if model is not None else None
+            results = [
+                self.transcribe_chunk(self.whisper_model, language, chunk, loaded)
+                for chunk in chunks
+            ]
+        else:
+            workers = min(self.max_workers, len(chunks))
+            log.info(
+                f"Transcribing {len(chunks)} audio chunks with {workers} processes."
+            )
+
+            # Spawned workers avoid forking a process with live torch threads
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=get_context("spawn"),
+                initializer=self.init_worker,
+                initargs=(workers,),
+            ) as pool:
+                results = list(
+                    pool.map(
+                        partial(self.transcribe_chunk, self.whisper_model, language),
+                        chunks,
+                    )
+                )
+
+        return self.stitch(results, offsets)
+
+    @staticmethod
+    def init_worker(num_workers: int) -> None:
+        from os import cpu_count
+
+        import torch
+
+        # Splits the CPU cores between workers instead of oversubscribing them
+        torch.set_num_threads(max((cpu_count() or 1) // num_workers, 1))
+
+    @staticmethod
+    def transcribe_chunk(
+        whisper_model: str, language: str, audio: ndarray, model=None
+    ) -> dict:
+        import whisper_timestamped as whisper
+
+        if model is None:
+            if whisper_model not in worker_models:
+                worker_models[whisper_model] = whisper.load_model(
+                    whisper_model, device="cpu"
+                )
+            model = worker_models[whisper_model]
+        return whisper.transcribe(model, audio, language=language, verbose=None)
+
+    @staticmethod
+    def stitch(results: list[dict], offsets: list[float]) -> dict:
+        segments: list[dict] = []
+        for result, offset in zip(results, offsets):
+            for segment in result.get("segments", []):
+                segment = {
+                    **segment,
+                    "id": len(segments),
+                    "start": round(segment["start"] + offset, 2),
+                    "end": round(segment["end"] + offset, 2),
+                }
+                if "seek" in segment:
+                    segment["seek"] += round(offset * SEEK_FRAMES_PER_SECOND)
+                if "words" in segment:
+                    segment["words"] = [
+                        {
+                            **word,
+                            "start": round(word["start"] + offset, 2),
+                            "end": round(word["end"] + offset, 2),
+                        }
+                        for word in segment["words"]
+                    ]
+                segments.append(segment)
+
+        return {
+            "text": " ".join(
+                result["text"].strip() for result in results if result.get("text")
+            ),
+            "segments": segments,
+            "language": results[0].get("language") if results else None,
+        }
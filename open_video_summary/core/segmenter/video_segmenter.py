@@ -1,11 +1,24 @@
-import whisper_timestamped as whisper
-from json import loads
+from re import split
 from math import floor
+from json import JSONDecodeError, dumps, loads
 from typing import Optional
-from moviepy import VideoFileClip
 
-from open_video_summary.adapters.llm import LLMAdapter, OllamaAdapter
+from open_video_summary.utils import log
+from open_video_summary.utils.lazy import LazyModel
+from open_video_summary.adapters.llm import (
+    LLMAdapter,
+    LLMPatternNotFoundError,
+    OllamaAdapter,
+)
 from open_video_summary.core.segmenter.prompts import VideoSegmenterPrompts
+from open_video_summary.core.segmenter.topics import (
+    LLMTopicClassifier,
+    TopicClassifier,
+)
+from open_video_summary.core.segmenter.transcription import (
+    ChunkedTranscriber,
+    TranscriptCache,
+)
 from open_video_summary.entities.video import Video, VideoSegment
 from open_video_summary.handlers.segment import SegmentsCluster
 
@@ -19,8 +32,15 @@ class VideoSegmenter:
         segment_overlap_ratio: float = 0.5,
         max_phrase_pause_interval: float = 0.7,
         max_subtopics: Optional[int] = None,
-        prompts_template: VideoSegmenterPrompts = VideoSegmenterPrompts(),
-        llm_adapter: LLMAdapter = OllamaAdapter(),
+        prompts_template: Optional[VideoSegmenterPrompts] = None,
+        llm_adapter: Optional[LLMAdapter] = None,
+        transcript_cache_dir: Optional[str] = None,
+        transcription_chunk_seconds: Optional[float] = None,
+        transcription_workers: int = 1,
+        topic_extraction: str = "single",
+        topic_chunk_tokens: int = 2000,
+        chars_per_token: float = 4,
+        topic_classifier: Optional[TopicClassifier] = None,
     ) -> None:
         self.whisper_model = whisper_model
         self.min_segment_length = min_segment_length
@@ -28,31 +48,180 @@ class VideoSegmenter:
         self.segment_overlap_ratio = segment_overlap_ratio
         self.max_phrase_pause_interval = max_phrase_pause_interval
         self.max_subtopics = max_subtopics
-        self.prompts_template = prompts_template 
-        self.llm_adapter = llm_adapter
+        self.prompts_template = prompts_template or VideoSegmenterPrompts()
+        self.llm_adapter = llm_adapter or OllamaAdapter()
+        self.topic_classifier = topic_classifier or LLMTopicClassifier(
+            self.llm_adapter, self.prompts_template
+        )
+        self.transcript_cache = (
+            TranscriptCache(transcript_cache_dir) if transcript_cache_dir else None
+        )
+        self.transcription_chunk_seconds = transcription_chunk_seconds
+        self.transcription_workers = transcription_workers
+        self.transcriber = (
+            ChunkedTranscriber(
+                whisper_model,
+                chunk_seconds=transcription_chunk_seconds,
+                max_workers=transcription_workers,
+            )
+            if transcription_chunk_seconds is not None
+            else None
+        )
+        self.topic_extraction = topic_extraction
+        self.topic_chunk_tokens = topic_chunk_tokens
+        self.chars_per_token = chars_per_token
+        self.whisper = LazyModel(self.load_whisper_model)
+
+        if topic_extraction not in {"single", "hierarchical"}:
+            raise ValueError(
+                "The `topic_extraction` must be either 'single' or 'hierarchical'."
+            )
+
+    def load_whisper_model(self):
+        import whisper_timestamped as whisper
+
+        log.info(f"Loading Whisper model {self.whisper_model}.")
+        return whisper.load_model(self.whisper_model)
+
+    @property
+    def transcription_mode(self) -> str:
+        if self.transcription_chunk_seconds is None:
+            return self.whisper_model
+        return f"{self.whisper_model}:chunked:{self.transcription_chunk_seconds}"
 
     def transcribe_video(self, video_path: str, language: str):
-        model = whisper.load_model(self.whisper_model)
+        cache_key = None
+        if self.transcript_cache is not None:
+            cache_key = self.transcript_cache.key(
+                video_path, self.transcription_mode, language
+            )
+            transcript = self.transcript_cache.get(cache_key)
+            if transcript is not None:
+                return transcript
+
+        import whisper_timestamped as whisper
+
         audio = whisper.load_audio(video_path)
-        return whisper.transcribe(model, audio, language=language, verbose=True)
+        if self.transcriber is None:
+            transcript = whisper.transcribe(
+                self.whisper.get(), audio, language=language, verbose=True
+            )
+        else:
+            # Worker processes load their own models, the local one is only loaded
+            # when the audio is transcribed serially
+            transcript = self.transcriber.transcribe(
+                audio, language, model=self.whisper
+            )
+
+        if self.transcript_cache is not None and cache_key is not None:
+            self.transcript_cache.put(cache_key, transcript)
+        return transcript
 
     def load_video_topics(self, full_document: str, video: Video) -> dict[str, str]:
+        from moviepy import VideoFileClip
+
         clip = VideoFileClip(video.path)
         video_duration = clip.duration
 
         max_subtopics = self.max_subtopics or floor(
             video_duration / self.min_segment_length
         )
+        if self.topic_extraction == "hierarchical":
+            return self.extract_topics_hierarchically(full_document, max_subtopics)
+        return self.extract_topics(full_document, max_subtopics)
+
+    def extract_topics(self, document: str, max_subtopics: int) -> dict[str, str]:
         topics_prompt = self.prompts_template.generate_subtopics.format(
-            full_video_transcript=full_document, max_subtopics=max_subtopics
+            full_video_transcript=document, max_subtopics=max_subtopics
         )
         topics_str = self.llm_adapter.generate_pattern(
             prompt=topics_prompt,
-            pattern="(\{.*?\})",
+            pattern=r"(\{.*?\})",
             options={"format": "json", "temperature": 0.5},
         )
         return loads(topics_str)
 
+    def extract_topics_hierarchically(
+        self, document: str, max_subtopics: int
+    ) -> dict[str, str]:
+        chunks = self.chunk_transcript(document)
+        if len(chunks) <= 1:
+            return self.extract_topics(document, max_subtopics)
+
+        log.info(f"Extracting topics from {len(chunks)} transcript chunks.")
+        chunk_topics = self.llm_adapter.generate_pattern_many(
+            [
+                self.prompts_template.generate_subtopics.format(
+                    full_video_transcript=chunk, max_subtopics=max_subtopics
+                )
+                for chunk in chunks
+            ],
+            pattern=r"(\{.*\})",
+            defaults=["{}"] * len(chunks),
+            options={"format": "json", "temperature": 0.5},
+        )
+
+        # Exact duplicates are dropped here, the reduce prompt merges the similar ones
+        candidates: dict[str, str] = {}
+        for index, topics_str in enumerate(chunk_topics):
+            try:
+                chunk_candidates = loads(topics_str)
+            except JSONDecodeError:
+                log.warning(f"Skipping invalid topics JSON of chunk {index}.")
+                continue
+
+            for topic in chunk_candidates.values():
+                candidates.setdefault(str(topic).strip().lower(), str(topic).strip())
+
+        if not candidates:
+            log.warning("No chunk topics extracted, falling back to a single pass.")
+            return self.extract_topics(document, max_subtopics)
+
+        merge_prompt = self.prompts_template.merge_subtopics.format(
+            candidate_topics=dumps(list(candidates.values()), ensure_ascii=False),
+            max_subtopics=max_subtopics,
+        )
+        # Greedy match, so the whole JSON object is parsed even if it has nested ones
+        try:
+            topics_str = self.llm_adapter.generate_pattern(
+                prompt=merge_prompt,
+                pattern=r"(\{.*\})",
+                options={"format": "json", "temperature": 0.5},
+            )
+            topics = loads(topics_str)
+        except (LLMPatternNotFoundError, JSONDecodeError):
+            log.warning("Topics merge failed, keeping the deduplicated chunk topics.")
+            topics = {
+                str(index): topic for index, topic in enumerate(candidates.values())
+            }
+        return dict(list(topics.items())[:max_subtopics])
+
+    def chunk_transcript(self, document: str) -> list[str]:
+        """Packs whole sentences into chunks of at most `topic_chunk_tokens`.
+
+        Tokens are estimated from the text length with `chars_per_token`.
+        """
+        max_chars = int(self.topic_chunk_tokens * self.chars_per_token)
+
+        chunks, chunk = [], ""
+        for sentence in split(r"(?<=[.!?])\s+", document.strip()):
+            if chunk and len(chunk) + len(sentence) + 1 > max_chars:
+                chunks.append(chunk)
+                chunk = ""
+
+            # Sentences longer than the budget are cut at word boundaries
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                chunks.append(sentence[:cut])
+                sentence = sentence[cut:].strip()
+
+            chunk = f"{chunk} {sentence}" if chunk else sentence
+
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
     def list_overlapping_clusters(
         self, segmented_document: list[dict]
     ) -> list[SegmentsCluster]:
@@ -96,19 +265,11 @@ class VideoSegmenter:
     ) -> list[VideoSegment]:
         min_segments: dict[int, dict] = {}
 
-        for cluster in cluster_list:
-            prompt = self.prompts_template.classify_subtopic.format(
-                content=cluster.content, topics=topics
-            )
-            topics_str = self.llm_adapter.generate_pattern(
-                prompt=prompt,
-                pattern="(\{.*?\})",
-                options={"format": "json", "temperature": 0.2},
-            )
-
-            cluster_topic = loads(topics_str)
-            topic_id, _ = cluster_topic.popitem()
+        topic_ids = self.topic_classifier.classify(
+            [cluster.content for cluster in cluster_list], topics
+        )
 
+        for cluster, topic_id in zip(cluster_list, topic_ids):
             for cluster_seg in cluster.segments:
                 if (
                     cluster_seg.order is not None
@@ -162,13 +323,16 @@ class VideoSegmenter:
 
     def fix_segments_content(self, segments: list[VideoSegment]) -> list[VideoSegment]:
         adjusted_segments = []
-        for seg in segments:
-            prompt = self.prompts_template.fix_transcription.format(content=seg.content)
-            response = self.llm_adapter.generate_pattern(
-                prompt=prompt,
-                pattern="([\w \.\?!,:;ºª\-]+)",
-                options={"format": "json", "temperature": 0.2},
-            )
+        responses = self.llm_adapter.generate_pattern_many(
+            [
+                self.prompts_template.fix_transcription.format(content=seg.content)
+                for seg in segments
+            ],
+            pattern=r"([\w \.\?!,:;ºª\-]+)",
+            defaults=[seg.content for seg in segments],
+            options={"format": "json", "temperature": 0.2},
+        )
+        for seg, response in zip(segments, responses):
             seg.content = response.strip()
             adjusted_segments.append(seg)
         return adjusted_segments
@@ -1,8 +1,11 @@
-from typing import Optional
+from typing import Generator, Optional
+from numpy import ndarray
 from abc import ABC, abstractmethod
 
 from open_video_summary.entities.video import Video, VideoSegment
 from open_video_summary.handlers.summary import SummarySegmentHandler
+from open_video_summary.utils.processing.video import VideoProcessor
+from open_video_summary.utils.processing.frames import FrameRequirement, FrameStore
 
 
 class SelectionCriteria(ABC):
@@ -11,6 +14,7 @@ class SelectionCriteria(ABC):
     ) -> None:
         self.read_from = read_from
         self.source_criteria = source_criteria
+        self.frame_store: Optional[FrameStore] = None
 
     @abstractmethod
     def evaluate(self, handler: SummarySegmentHandler) -> SummarySegmentHandler:
@@ -28,15 +32,44 @@ class SelectionCriteria(ABC):
         )
         return getattr(source_obj, self.read_from)
 
+    def frame_requirements(self) -> list[FrameRequirement]:
+        return []
+
+    def iter_frames(
+        self,
+        video_path: str,
+        target_fps: int | float = 1,
+        grayscale: bool = False,
+        start_second: int | float = 0,
+        end_second: Optional[int | float] = None,
+        seek: bool = False,
+    ) -> Generator[ndarray, None, None]:
+        # The store decodes whole videos, ranged requests keep streaming or seeking
+        full_video = not start_second and end_second is None and not seek
+        if self.frame_store is not None and full_video:
+            yield from self.frame_store.retrieve(
+                video_path, target_fps=target_fps, grayscale=grayscale
+            )
+            return
+
+        yield from VideoProcessor.iter_video_frames(
+            video_path,
+            target_fps=target_fps,
+            grayscale=grayscale,
+            start_second=start_second,
+            end_second=end_second,
+            seek=seek,
+        )
+
     def remove_discarded(
         self, handler: SummarySegmentHandler, segments: list[VideoSegment]
     ) -> list[VideoSegment]:
-        return list(filter(lambda x: x not in handler.discard, segments))
+        return [segment for segment in segments if not handler.is_discarded(segment)]
 
     def remove_outputted(
         self, handler: SummarySegmentHandler, segments: list[VideoSegment]
     ) -> list[VideoSegment]:
-        return list(filter(lambda x: x not in handler.output, segments))
+        return [segment for segment in segments if not handler.is_output(segment)]
 
     def include(self, handler: SummarySegmentHandler, segment: VideoSegment) -> None:
         handler.include_segment(segment=segment, agent=self.name)
@@ -1,11 +1,14 @@
 from math import ceil
+from typing import Generator, Optional
+from numpy import ndarray
+from contextlib import closing
 
 from open_video_summary.utils import log
 from open_video_summary.handlers.video import VideoHandler
 from open_video_summary.entities.video import Video, VideoSegment
 from open_video_summary.utils.processing.image import ImageProcessor
-from open_video_summary.utils.processing.video import VideoProcessor
 from open_video_summary.handlers.summary import SummarySegmentHandler
+from open_video_summary.utils.processing.frames import FrameRequirement
 from open_video_summary.core.selection_criteria.base import SelectionCriteria
 
 
@@ -16,12 +19,17 @@ class Introduction(SelectionCriteria):
         compare_grayscale: bool = True,
         frame_diff_threshold: float = 0.7,  # Semelhança, não diff
         skip_frames: int = 1,
+        max_intro_seconds: Optional[float] = None,
     ) -> None:
         super().__init__(read_from="source")
         self.fps_to_compare = fps_to_compare
         self.compare_grayscale = compare_grayscale
         self.frame_diff_threshold = frame_diff_threshold
         self.skip_frames = skip_frames
+        self.max_intro_seconds = max_intro_seconds
+
+    def frame_requirements(self) -> list[FrameRequirement]:
+        return [FrameRequirement(self.fps_to_compare, self.compare_grayscale)]
 
     def evaluate(self, handler: SummarySegmentHandler) -> SummarySegmentHandler:
         videos = [
@@ -47,6 +55,9 @@ class Introduction(SelectionCriteria):
         min_end_sec, min_intro_segments = None, []
         for video in source_videos:
             intro_end_sec = self.get_video_introduction_end_second(video)
+            if intro_end_sec is None:
+                continue
+
             intro_segments = VideoHandler.get_segments_until_second(
                 video, intro_end_sec
             )
@@ -60,30 +71,68 @@ class Introduction(SelectionCriteria):
 
         return min_intro_segments
 
-    def get_video_introduction_end_second(self, video: Video) -> int:
+    def get_video_introduction_end_second(self, video: Video) -> Optional[int]:
         log.info(f"Retrieving final second for intro in video {video.name}.")
 
-        video_frames = VideoProcessor.retrieve_video_frames(
+        video_frames = self.iter_intro_frames(video)
+
+        frame = 0
+        with closing(video_frames):
+            curr_frame = next(video_frames, None)
+            if curr_frame is None:
+                return frame
+            curr_histogram = ImageProcessor.get_frame_histogram(curr_frame)
+
+            for frame, next_frame in enumerate(video_frames):
+                # Calculating histogram intersection between frames
+                next_histogram = ImageProcessor.get_frame_histogram(next_frame)
+                histogram_intersec = ImageProcessor.compare_histograms(
+                    curr_histogram, next_histogram
+                )
+
+                # If matches threshold rule, returns the frame second
+                if histogram_intersec < self.frame_diff_threshold:
+                    return ceil(frame / self.fps_to_compare)
+
+                curr_frame, curr_histogram = next_frame, next_histogram
+
+        return self.introduction_end_without_drop(video, frame)
+
+    def iter_intro_frames(self, video: Video) -> Generator[ndarray, None, None]:
+        return self.iter_frames(
             video.path,
             target_fps=self.fps_to_compare,
             grayscale=self.compare_grayscale,
             start_second=self.skip_frames,
+            end_second=(
+                self.skip_frames + self.max_intro_seconds
+                if self.max_intro_seconds is not None
+                else None
+            ),
+            seek=True,
         )
 
-        curr_frame = video_frames.pop(0)
-        curr_histogram = ImageProcessor.get_frame_histogram(curr_frame)
+    def get_histogram_intersections(self, video: Video) -> ndarray:
+        """Intersections between every pair of consecutive frames histograms,
+        computed in batch for offline analysis of the introduction window."""
+        return ImageProcessor.histogram_intersections(
+            list(self.iter_intro_frames(video))
+        )
 
-        for frame, next_frame in enumerate(video_frames):
-            # Calculating histogram intersection between frames
-            next_histogram = ImageProcessor.get_frame_histogram(next_frame)
-            histogram_intersec = ImageProcessor.compare_histograms(
-                curr_histogram, next_histogram
+    def get_introduction_end_from_intersections(
+        self, video: Video, intersections: ndarray
+    ) -> Optional[int]:
+        below_threshold = (intersections < self.frame_diff_threshold).nonzero()[0]
+        if len(below_threshold):
+            return ceil(below_threshold[0] / self.fps_to_compare)
+        return self.introduction_end_without_drop(video, max(len(intersections) - 1, 0))
+
+    def introduction_end_without_drop(self, video: Video, frame: int) -> Optional[int]:
+        # A capped window without a similarity drop doesn't contain the intro end
+        if self.max_intro_seconds is not None:
+            log.info(
+                f"No introduction found in the first {self.max_intro_seconds} "
+                f"seconds of video {video.name}."
             )
-
-            # If matches threshold rule, returns the frame second
-            if histogram_intersec < self.frame_diff_threshold:
-                return ceil(frame / self.fps_to_compare)
-
-            curr_frame, curr_histogram = next_frame, next_histogram
-
+            return None
         return ceil(frame / self.fps_to_compare)
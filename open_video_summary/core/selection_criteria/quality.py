@@ -1,12 +1,17 @@
-from typing import Callable
-from pandas import DataFrame
+from pathlib import Path
+from numpy import argsort, concatenate, ndarray
+from typing import Callable, Iterable, Optional
 
 from open_video_summary.utils import log
 from open_video_summary.entities.video import VideoSegment
-from open_video_summary.utils.processing.video import VideoProcessor
+from open_video_summary.utils.processing.frames import FrameRequirement
 from open_video_summary.handlers.summary import SummarySegmentHandler
 from open_video_summary.core.selection_criteria.base import SelectionCriteria
-from open_video_summary.utils.processing.image import BagOfVisualWords, ImageProcessor
+from open_video_summary.utils.processing.image import (
+    BagOfVisualWords,
+    ImageProcessor,
+    VisualVocabulary,
+)
 
 
 class QualityPick(SelectionCriteria):
@@ -16,11 +21,34 @@ class QualityPick(SelectionCriteria):
         top_n_segments: int = 1,
         bovw_dict_size: int = 300,
         features_extractor: Callable = ImageProcessor.ks_sift,
+        vocabulary_mode: str = "cluster",
+        vocabulary_path: Optional[str] = None,
+        reuse_vocabulary: bool = False,
+        kmeans_method: str = "kmeans",
+        max_descriptors: Optional[int] = None,
     ) -> None:
         super().__init__(read_from="pick", source_criteria=source_criteria)
         self.top_n_segments = top_n_segments
         self.bovw_dict_size = bovw_dict_size
         self.features_extractor = features_extractor
+        self.vocabulary_mode = vocabulary_mode
+        self.vocabulary_path = vocabulary_path
+        self.reuse_vocabulary = reuse_vocabulary
+        self.kmeans_method = kmeans_method
+        self.max_descriptors = max_descriptors
+
+        if vocabulary_mode not in {"cluster", "shared"}:
+            raise ValueError(
+                "The `vocabulary_mode` must be either 'cluster' or 'shared'."
+            )
+
+        if vocabulary_mode == "cluster" and vocabulary_path is not None:
+            raise ValueError(
+                "The `vocabulary_path` requires `vocabulary_mode='shared'`."
+            )
+
+    def frame_requirements(self) -> list[FrameRequirement]:
+        return [FrameRequirement(grayscale=True)]
 
     def evaluate(self, handler: SummarySegmentHandler) -> SummarySegmentHandler:
         clusters = [
@@ -30,49 +58,125 @@ class QualityPick(SelectionCriteria):
         ]
         log.info(f"Retrieved {len(clusters)} cluster to execute {self.name} criteria.")
 
-        for cluster in clusters:
-            seg_features = self.extract_segments_visual_features(cluster)
-            df = self.get_bovw_dataframe(seg_features)
+        # Segments may be in several clusters, their features are extracted once
+        features_cache: dict[tuple[str, float, float], ndarray] = {}
+        clusters_features = [
+            self.extract_segments_visual_features(cluster, features_cache)
+            for cluster in clusters
+        ]
+        shared_vocabulary = self.get_shared_vocabulary(features_cache)
+
+        for cluster, seg_features in zip(clusters, clusters_features):
+            if not self.has_descriptors(seg_features.values()):
+                log.info("Skipping cluster without visual descriptors.")
+                continue
+
+            segments, histograms = self.get_bovw_histograms(
+                seg_features, shared_vocabulary
+            )
 
             log.info(f"Retrieving top-{self.top_n_segments} segments from cluster.")
 
-            df["histogram_sum"] = df.sum(axis=1)
-            top_segments = df.nlargest(
-                self.top_n_segments, columns="histogram_sum"
-            ).index.to_list()
+            # Stable sort keeps the first segment on ties
+            histogram_sum = histograms.sum(axis=1)
+            top_segments = [
+                segments[index]
+                for index in argsort(-histogram_sum, kind="stable")[
+                    : self.top_n_segments
+                ]
+            ]
 
             # Discarding whole cluster and including only best-quality segment
-            map(lambda s: self.discard(handler, s), cluster)
+            for segment in cluster:
+                self.discard(handler, segment)
             for segment in top_segments:
                 self.include(handler, segment)
 
         return handler
 
     def extract_segments_visual_features(
-        self, segments: set[VideoSegment]
-    ) -> dict[VideoSegment, list]:
+        self,
+        segments: set[VideoSegment],
+        features_cache: Optional[dict[tuple[str, float, float], ndarray]] = None,
+    ) -> dict[VideoSegment, ndarray]:
         log.info("Extracting visual features from segments.")
-        return {
-            segment: self.features_extractor(
-                VideoProcessor.retrieve_video_frames(
-                    segment.video_path,
-                    grayscale=True,
+        features_cache = {} if features_cache is None else features_cache
+
+        segments_features = {}
+        for segment in segments:
+            key = (segment.video_path, segment.start, segment.end)
+            if key not in features_cache:
+                features_cache[key] = self.features_extractor(
+                    self.iter_frames(
+                        segment.video_path,
+                        grayscale=True,
+                        start_second=segment.start,
+                        end_second=segment.end,
+                        seek=True,
+                    )
                 )
-            )
-            for segment in segments
-        }
+            segments_features[segment] = features_cache[key]
 
-    def get_bovw_dataframe(
-        self, segments_features: dict[VideoSegment, list]
-    ) -> DataFrame:
+        return segments_features
+
+    @staticmethod
+    def has_descriptors(features: Iterable[ndarray]) -> bool:
+        return any(len(descriptors) for descriptors in features)
+
+    def create_vocabulary(self) -> VisualVocabulary:
+        return VisualVocabulary(
+            dict_size=self.bovw_dict_size,
+            method=self.kmeans_method,
+            max_descriptors=self.max_descriptors,
+        )
+
+    def get_shared_vocabulary(
+        self, features_cache: dict[tuple[str, float, float], ndarray]
+    ) -> Optional[VisualVocabulary]:
+        # A saved codebook doesn't record its fitting parameters, so reusing it
+        # must be requested explicitly, otherwise it's refitted and overwritten
+        if (
+            self.reuse_vocabulary
+            and self.vocabulary_path is not None
+            and Path(self.vocabulary_path).exists()
+        ):
+            vocabulary = VisualVocabulary.load(self.vocabulary_path)
+            if vocabulary.dict_size != self.bovw_dict_size:
+                log.warning(
+                    f"Reused visual vocabulary has {vocabulary.dict_size} words, "
+                    f"expected {self.bovw_dict_size}."
+                )
+            return vocabulary
+
+        if self.vocabulary_mode != "shared" or not self.has_descriptors(
+            features_cache.values()
+        ):
+            return None
+
+        log.info("Fitting one visual vocabulary shared by all clusters.")
+        vocabulary = self.create_vocabulary().fit(
+            concatenate(list(features_cache.values()))
+        )
+        if self.vocabulary_path is not None:
+            vocabulary.save(self.vocabulary_path)
+
+        return vocabulary
+
+    def get_bovw_histograms(
+        self,
+        segments_features: dict[VideoSegment, ndarray],
+        vocabulary: Optional[VisualVocabulary] = None,
+    ) -> tuple[list[VideoSegment], ndarray]:
         log.info(
             f"Generating Bag-of-Visual-Words for {len(segments_features)} segments."
         )
         bovw = BagOfVisualWords(
             items=segments_features,
             dict_size=self.bovw_dict_size,
+            vocabulary=vocabulary or self.create_vocabulary(),
         )
         log.info("Fitting KMeans algorithm for Bag-of-Visual-Words generated.")
         bovw.fit_kmeans()
 
-        return bovw.generate_bovw_dataframe()
+        segments, histograms, _ = bovw.generate_bovw_matrix()
+        return segments, histograms
@@ -1,12 +1,33 @@
+from typing import Optional
 from pandas import DataFrame
-from numpy import equal, tril
+from scipy.sparse import csr_matrix  # type: ignore
+from numpy import (
+    append,
+    arange,
+    array,
+    asarray,
+    concatenate,
+    cumsum,
+    diff,
+    flatnonzero,
+    full,
+    iinfo,
+    int32,
+    int64,
+    lexsort,
+    minimum,
+    ndarray,
+    repeat,
+    unique,
+)
+from numpy.random import default_rng
 from sklearn.feature_extraction.text import TfidfVectorizer  # type: ignore
 
 from open_video_summary.utils import log
 from open_video_summary.entities.video import Video, VideoSegment
 from open_video_summary.handlers.summary import SummarySegmentHandler
+from open_video_summary.utils.helpers import UnionFind
 from open_video_summary.core.selection_criteria.base import SelectionCriteria
-from open_video_summary.utils.helpers import custom_cosine
 
 
 class ContentBasedRedundancy(SelectionCriteria):
@@ -14,10 +35,23 @@ class ContentBasedRedundancy(SelectionCriteria):
         self,
         reference_time_sec: int = 785,
         base_threshold: float = 0.17,
+        candidate_search: str = "exact",
+        lsh_rows: int = 3,
+        lsh_bands: int = 40,
+        lsh_max_bucket_size: Optional[int] = 1000,
+        random_state: int = 0,
     ) -> None:
         super().__init__(read_from="source")
         self.reference_time_sec = reference_time_sec
         self.base_threshold = base_threshold
+        self.candidate_search = candidate_search
+        self.lsh_rows = lsh_rows
+        self.lsh_bands = lsh_bands
+        self.lsh_max_bucket_size = lsh_max_bucket_size
+        self.random_state = random_state
+
+        if candidate_search not in {"exact", "lsh"}:
+            raise ValueError("The `candidate_search` must be either 'exact' or 'lsh'.")
 
     def evaluate(self, handler: SummarySegmentHandler) -> SummarySegmentHandler:
         videos = [
@@ -27,9 +61,9 @@ class ContentBasedRedundancy(SelectionCriteria):
         ]
         log.info(f"Found {len(videos)} videos to execute {self.name} criteria.")
 
-        bow_df = self.get_bow_df(videos)
+        tfidf_matrix = self.get_tfidf_matrix(videos)
         correlations = self.get_correlations_df(
-            bow_df, threshold=self.calc_min_threshold(videos)
+            tfidf_matrix, videos, threshold=self.calc_min_threshold(videos)
         )
         redundancies = self.get_redundancies(correlations)
         redundancy_clusters = self.cluster_segments(handler, redundancies, videos)
@@ -47,53 +81,170 @@ class ContentBasedRedundancy(SelectionCriteria):
         diff = (set_time - self.reference_time_sec) / self.reference_time_sec
         return self.base_threshold + self.base_threshold * diff
 
-    def get_bow_df(self, videos: list[Video]) -> DataFrame:
-        log.info("Generating bag-of-words DataFrame for videos found.")
-        items = {
-            (vid_index, seg_index): segment.content
-            for vid_index, video in enumerate(videos)
-            for seg_index, segment in enumerate(video.segments)
-        }
+    def get_tfidf_matrix(self, videos: list[Video]) -> csr_matrix:
+        log.info("Generating TF-IDF matrix for videos found.")
+        sentences = [
+            segment.content for video in videos for segment in video.segments
+        ]
+
+        # Rows are L2-normalized, so their dot product is the cosine similarity
+        vectorizer = TfidfVectorizer(use_idf=True, smooth_idf=False, norm="l2")
+        return vectorizer.fit_transform(sentences)
 
-        index_names = ["video_index", "segment_index"]
-        index_df = DataFrame(items.keys(), columns=index_names)
+    def get_correlations_df(
+        self, tfidf_matrix: csr_matrix, videos: list[Video], threshold: float
+    ) -> DataFrame:
+        log.info("Calculating correlations from TF-IDF matrix.")
+        video_sizes = [len(video.segments) for video in videos]
+        offsets = concatenate([[0], cumsum(video_sizes)]).astype(int)
+        segment_videos = repeat(arange(len(videos)), video_sizes)
+        segment_indexes = arange(offsets[-1]) - offsets[segment_videos]
 
-        sentences = list(items.values())
+        if self.candidate_search == "lsh":
+            row, col, value = self.get_lsh_similarities(
+                tfidf_matrix, segment_videos, threshold
+            )
+        else:
+            row, col, value = self.get_exact_similarities(
+                tfidf_matrix, offsets, threshold
+            )
 
-        vectorizer = TfidfVectorizer(use_idf=True, smooth_idf=False)
-        tfidf_data = vectorizer.fit_transform(sentences)
-        tfidf_df = DataFrame(
-            tfidf_data.toarray(), columns=vectorizer.get_feature_names_out()
+        # Pairs are listed column by column, as in a melted correlation matrix
+        order = lexsort((row, col))
+        row, col, value = row[order], col[order], value[order]
+
+        return DataFrame(
+            {
+                "video_index": segment_videos[row],
+                "segment_index": segment_indexes[row],
+                "video_index_col": segment_videos[col],
+                "segment_index_col": segment_indexes[col],
+                "value": value,
+            }
         )
 
-        return index_df.join(tfidf_df).set_index(index_names)
+    def get_exact_similarities(
+        self, tfidf_matrix: csr_matrix, offsets: ndarray, threshold: float
+    ) -> tuple[ndarray, ndarray, ndarray]:
+        rows: list[ndarray] = [array([], dtype=int)]
+        cols: list[ndarray] = [array([], dtype=int)]
+        values: list[ndarray] = [array([], dtype=float)]
 
-    def get_correlations_df(self, bow_df: DataFrame, threshold: float) -> DataFrame:
-        log.info("Calculating correlations DataFrame from bag-of-words.")
-        correlations = bow_df.T.corr(custom_cosine)
+        # Comparing each pair of videos once, skipping same-video blocks
+        for vid_a in range(len(offsets) - 1):
+            block_a = tfidf_matrix[offsets[vid_a] : offsets[vid_a + 1]]
+            for vid_b in range(vid_a + 1, len(offsets) - 1):
+                block_b = tfidf_matrix[offsets[vid_b] : offsets[vid_b + 1]]
+                similarities = (block_a @ block_b.T).tocoo()
 
-        # Disregarding same-video comparisons
-        is_same_video = equal.outer(
-            correlations.index.get_level_values("video_index"),
-            correlations.columns.get_level_values("video_index"),
-        )
+                # Keeping only similarities greater than threshold, block by block
+                is_gt_threshold = similarities.data > threshold
+                rows.append(similarities.row[is_gt_threshold] + offsets[vid_a])
+                cols.append(similarities.col[is_gt_threshold] + offsets[vid_b])
+                values.append(similarities.data[is_gt_threshold])
+
+        return concatenate(rows), concatenate(cols), concatenate(values)
+
+    def get_lsh_similarities(
+        self, tfidf_matrix: csr_matrix, segment_videos: ndarray, threshold: float
+    ) -> tuple[ndarray, ndarray, ndarray]:
+        row, col = self.get_lsh_candidates(tfidf_matrix, segment_videos)
+        log.info(f"Comparing {len(row)} candidate pairs found with LSH.")
+        value = asarray(
+            tfidf_matrix[row].multiply(tfidf_matrix[col]).sum(axis=1)
+        ).ravel()
+
+        # Keeping only similarities greater than threshold
+        is_gt_threshold = value > threshold
+        return row[is_gt_threshold], col[is_gt_threshold], value[is_gt_threshold]
+
+    def get_lsh_candidates(
+        self, tfidf_matrix: csr_matrix, segment_videos: ndarray
+    ) -> tuple[ndarray, ndarray]:
+        """Pairs of segments from different videos whose MinHash signatures agree
+        on all `lsh_rows` values of at least one of the `lsh_bands` bands.
+
+        Buckets larger than `lsh_max_bucket_size` are skipped, since their pairs
+        grow quadratically and carry little similarity information."""
+        num_segments = tfidf_matrix.shape[0]
+
+        # Segments without any term have no similarity, and would share every bucket
+        has_terms = tfidf_matrix.getnnz(axis=1) > 0
+        signatures = self.get_minhash_signatures(tfidf_matrix)
+
+        pair_ids: list[ndarray] = [array([], dtype=int64)]
+        skipped = 0
+        for band in range(self.lsh_bands):
+            row, col, band_skipped = self.get_bucket_pairs(
+                signatures[:, band * self.lsh_rows : (band + 1) * self.lsh_rows],
+                has_terms,
+                segment_videos,
+            )
+            pair_ids.append(row.astype(int64) * num_segments + col)
+            skipped += band_skipped
+
+        if skipped:
+            log.warning(
+                f"Skipped {skipped} LSH buckets above the {self.lsh_max_bucket_size} "
+                "segments limit."
+            )
 
-        # Keeping only the upper diagonal of the pairwise comparisons
-        is_upper_diagonal = tril(correlations) > 0
+        pair_ids_array = unique(concatenate(pair_ids))
+        return pair_ids_array // num_segments, pair_ids_array % num_segments
 
-        # Keeping only similarities greater than treshold
-        is_gt_threshold = correlations.gt(threshold)
+    def get_minhash_signatures(self, tfidf_matrix: csr_matrix) -> ndarray:
+        """MinHash of the terms of each segment, `lsh_rows * lsh_bands` values."""
+        num_hashes = self.lsh_rows * self.lsh_bands
+        max_hash = iinfo(int32).max
 
-        correlations = (
-            correlations.mask(is_same_video | is_upper_diagonal | ~is_gt_threshold)
-            .dropna(axis="index", how="all")
-            .dropna(axis="columns", how="all")
+        # A random value per term and hash function stands for the permutations
+        term_hashes = default_rng(self.random_state).integers(
+            0, max_hash, size=(tfidf_matrix.shape[1], num_hashes), dtype=int32
         )
-        correlations = correlations.melt(ignore_index=False).dropna(subset=["value"])
-        correlations.columns = ["video_index_col", "segment_index_col", "value"]
-        correlations.reset_index(inplace=True)
+        signatures = full((tfidf_matrix.shape[0], num_hashes), max_hash, dtype=int32)
+
+        rows = flatnonzero(diff(tfidf_matrix.indptr))
+        if not len(rows):
+            return signatures
+
+        # Minimum over each row's terms, a few hash functions at a time to bound memory
+        for start in range(0, num_hashes, 64):
+            signatures[rows, start : start + 64] = minimum.reduceat(
+                term_hashes[tfidf_matrix.indices, start : start + 64],
+                tfidf_matrix.indptr[rows],
+                axis=0,
+            )
+        return signatures
+
+    def get_bucket_pairs(
+        self, band: ndarray, has_terms: ndarray, segment_videos: ndarray
+    ) -> tuple[ndarray, ndarray, int]:
+        """Pairs of segments from different videos with equal rows in `band`, lower
+        segment id first, and the number of buckets skipped for their size."""
+        order = lexsort(band.T)
+        order = order[has_terms[order]]
+        changes = (diff(band[order], axis=0) != 0).any(axis=1)
+        starts = flatnonzero(concatenate([[True], changes]))
+        sizes = diff(append(starts, len(order)))
+
+        skipped = 0
+        if self.lsh_max_bucket_size is not None:
+            is_small = sizes <= self.lsh_max_bucket_size
+            skipped = int((~is_small).sum())
+            order = order[repeat(is_small, sizes)]
+            sizes = sizes[is_small]
 
-        return correlations
+        # Each member is paired with the ones after it, which have higher ids since
+        # lexsort is stable
+        positions = arange(len(order))
+        counts = repeat(cumsum(sizes), sizes) - positions - 1
+        first = repeat(positions, counts)
+        steps = arange(counts.sum()) - repeat(cumsum(counts) - counts, counts)
+        second = first + 1 + steps
+
+        row, col = order[first], order[second]
+        is_other_video = segment_videos[row] != segment_videos[col]
+        return row[is_other_video], col[is_other_video], skipped
 
     def get_redundancies(self, correlations: DataFrame) -> list[list[tuple[int, int]]]:
         log.info("Finding redundant segments from correlations.")
@@ -119,30 +270,39 @@ class ContentBasedRedundancy(SelectionCriteria):
         redundancies: list[list[tuple[int, int]]],
         videos: list[Video],
     ) -> list[set[VideoSegment]]:
-        clusters: list[set[VideoSegment]] = []
-        locations: dict[VideoSegment, int] = {}
+        offsets = cumsum([0] + [len(video.segments) for video in videos]).tolist()
+        segments = [segment for video in videos for segment in video.segments]
+
+        # Ids of segments either discarded or outputted, checked once per segment
+        unavailable_ids = {
+            segment_id
+            for segment_id, segment in enumerate(segments)
+            if handler.is_discarded(segment) or handler.is_output(segment)
+        }
 
-        for item_a, item_b in redundancies:
-            segment_a = videos[item_a[0]].segments[item_a[1]]
-            segment_b = videos[item_b[0]].segments[item_b[1]]
+        clusters = UnionFind(len(segments))
+        first_pair: dict[int, int] = {}
+        for pair_index, (item_a, item_b) in enumerate(redundancies):
+            id_a = offsets[item_a[0]] + item_a[1]
+            id_b = offsets[item_b[0]] + item_b[1]
 
             # Disregarding redundancies which one of the elements was either discarded or outputted
-            if (
-                segment_a in handler.discard
-                or segment_a in handler.output
-                or segment_b in handler.discard
-                or segment_b in handler.output
-            ):
+            if id_a in unavailable_ids or id_b in unavailable_ids:
                 continue
 
-            if segment_a in locations:
-                clusters[locations[segment_a]].add(segment_b)
-                locations[segment_b] = locations[segment_a]
-            elif segment_b in locations:
-                clusters[locations[segment_b]].add(segment_a)
-                locations[segment_a] = locations[segment_b]
-            else:
-                clusters.append({segment_a, segment_b})
-                locations[segment_a] = len(clusters) - 1
-
-        return clusters
+            root_a, root_b = clusters.find(id_a), clusters.find(id_b)
+            order = min(
+                first_pair.pop(root_a, pair_index), first_pair.pop(root_b, pair_index)
+            )
+            first_pair[clusters.union(root_a, root_b)] = order
+
+        # Clusters are listed in the order their first redundancy was found
+        members: dict[int, set[VideoSegment]] = {
+            root: set() for root in sorted(first_pair, key=first_pair.__getitem__)
+        }
+        for segment_id, segment in enumerate(segments):
+            root = clusters.find(segment_id)
+            if root in members:
+                members[root].add(segment)
+
+        return list(members.values())
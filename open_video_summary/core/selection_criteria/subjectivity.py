@@ -1,8 +1,17 @@
+from copy import deepcopy
+from typing import Generator
+from numpy import ndarray
+from threading import local
+from functools import partial
+from contextlib import closing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
 from open_video_summary.utils import log
-from open_video_summary.entities.video import Video
+from open_video_summary.entities.video import Video, VideoSegment
 from open_video_summary.classifiers.image import ObjectDetector
 from open_video_summary.classifiers.text import BinaryTextClassifier
 from open_video_summary.utils.processing.video import VideoProcessor
+from open_video_summary.utils.processing.frames import FrameRequirement
 from open_video_summary.handlers.summary import SummarySegmentHandler
 from open_video_summary.core.selection_criteria.base import SelectionCriteria
 
@@ -15,6 +24,9 @@ class ObjectContentSubjectivity(SelectionCriteria):
         object_search_fps: int = 1,
         object_search_grayscale: bool = True,
         include_subjectivity: bool = False,
+        max_workers: int = 1,
+        executor: str = "thread",
+        classification_batch_size: int = 32,
     ) -> None:
         super().__init__(read_from="source")
         self.object_detector = object_detector
@@ -22,6 +34,18 @@ class ObjectContentSubjectivity(SelectionCriteria):
         self.object_search_fps = object_search_fps
         self.object_search_grayscale = object_search_grayscale
         self.include_subjectivity = include_subjectivity
+        self.max_workers = max_workers
+        self.executor = executor
+        self.classification_batch_size = classification_batch_size
+        self.detectors = local()
+
+        if executor not in {"thread", "process"}:
+            raise ValueError("The `executor` must be either 'thread' or 'process'.")
+
+    def frame_requirements(self) -> list[FrameRequirement]:
+        return [
+            FrameRequirement(self.object_search_fps, self.object_search_grayscale)
+        ]
 
     def evaluate(self, handler: SummarySegmentHandler) -> SummarySegmentHandler:
         videos = [
@@ -31,31 +55,92 @@ class ObjectContentSubjectivity(SelectionCriteria):
         ]
         log.info(f"Found {len(videos)} videos to execute {self.name} criteria.")
 
-        for video in videos:
-            segments = self.remove_discarded(handler, video.segments)
-            segments = self.remove_outputted(handler, segments)
-            for segment in segments:
-                if self.segment_contains_object(
-                    video_path=video.path, start=segment.start, end=segment.end
-                ) and self.segment_is_subjective(content=segment.content):
-                    action = self.include if self.include_subjectivity else self.discard
-                    action(handler, segment)
+        segments = [
+            segment
+            for video in videos
+            for segment in self.remove_outputted(
+                handler, self.remove_discarded(handler, video.segments)
+            )
+        ]
+        contains_object = self.find_segments_with_object(segments)
+
+        # Only segments containing the object need a subjectivity verdict
+        candidates = [
+            segment
+            for segment, contains in zip(segments, contains_object)
+            if contains
+        ]
+        is_subjective = self.segments_are_subjective(
+            [segment.content for segment in candidates]
+        )
+
+        # Handler actions are applied serially, in the same order as the segments
+        for segment, subjective in zip(candidates, is_subjective):
+            if subjective:
+                action = self.include if self.include_subjectivity else self.discard
+                action(handler, segment)
 
         return handler
 
+    def find_segments_with_object(self, segments: list[VideoSegment]) -> list[bool]:
+        if self.max_workers <= 1 or len(segments) <= 1:
+            return [
+                self.segment_contains_object(
+                    video_path=segment.video_path, start=segment.start, end=segment.end
+                )
+                for segment in segments
+            ]
+
+        log.info(
+            f"Detecting object in {len(segments)} segments with {self.max_workers} "
+            f"{self.executor} workers."
+        )
+        paths = [segment.video_path for segment in segments]
+        starts = [segment.start for segment in segments]
+        ends = [segment.end for segment in segments]
+
+        with self.create_executor() as pool:
+            if self.executor == "thread":
+                return list(pool.map(self.segment_contains_object, paths, starts, ends))
+
+            if self.frame_store is not None:
+                log.warning("Frame store cannot be shared with worker processes.")
+            search = partial(
+                self.search_object_in_video,
+                self.object_detector,
+                self.object_search_fps,
+                self.object_search_grayscale,
+            )
+            return list(pool.map(search, paths, starts, ends))
+
+    def create_executor(self) -> Executor:
+        if self.executor == "process":
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers, initializer=self.init_worker_detector
+        )
+
+    def init_worker_detector(self) -> None:
+        # OpenCV detectors are not thread-safe, so each worker thread gets a copy
+        self.detectors.detector = deepcopy(self.object_detector)
+
+    @property
+    def worker_detector(self) -> ObjectDetector:
+        return getattr(self.detectors, "detector", self.object_detector)
+
     def segment_contains_object(
         self, video_path: str, start: float, end: float
     ) -> bool:
         log.info(f"Detecting object in video {video_path} from {start} to {end}.")
-        frames = VideoProcessor.retrieve_video_frames(
+        frames = self.iter_frames(
             video_path,
             target_fps=self.object_search_fps,
             grayscale=self.object_search_grayscale,
             start_second=start,
             end_second=end,
+            seek=True,
         )
-
-        contains = any(map(self.object_detector.detect, frames))
+        contains = self.search_object(self.worker_detector, frames)
 
         log_str = (
             f"Segment {'does not contain' if not contains else 'contains'} object."
@@ -64,10 +149,42 @@ class ObjectContentSubjectivity(SelectionCriteria):
 
         return contains
 
-    def segment_is_subjective(self, content: str) -> bool:
-        log.info(f"Classifying subjectivity in segment content.")
-        is_subjective = self.subjectivity_classifier.classify(content)
+    @staticmethod
+    def search_object_in_video(
+        object_detector: ObjectDetector,
+        target_fps: int | float,
+        grayscale: bool,
+        video_path: str,
+        start: float,
+        end: float,
+    ) -> bool:
+        frames = VideoProcessor.iter_video_frames(
+            video_path,
+            target_fps=target_fps,
+            grayscale=grayscale,
+            start_second=start,
+            end_second=end,
+            seek=True,
+        )
+        return ObjectContentSubjectivity.search_object(object_detector, frames)
 
-        log_str = f"Content {'is not' if not is_subjective else 'is'} subjective."
-        log.info(log_str)
-        return is_subjective
+    @staticmethod
+    def search_object(
+        object_detector: ObjectDetector, frames: Generator[ndarray, None, None]
+    ) -> bool:
+        # Stops decoding the segment at the first frame containing the object
+        with closing(frames):
+            return object_detector.detect_any(frames)
+
+    def segments_are_subjective(self, contents: list[str]) -> list[bool]:
+        log.info(
+            f"Classifying subjectivity in {len(contents)} segments contents, "
+            f"{self.classification_batch_size} at a time."
+        )
+        verdicts: list[bool] = []
+        for batch_start in range(0, len(contents), self.classification_batch_size):
+            batch = contents[batch_start : batch_start + self.classification_batch_size]
+            verdicts.extend(self.subjectivity_classifier.classify_list(batch))
+
+        log.info(f"Found {sum(verdicts)} subjective segments contents.")
+        return verdicts
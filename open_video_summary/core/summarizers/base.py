@@ -1,6 +1,8 @@
+from typing import Optional
 from functools import reduce
 
 from open_video_summary.entities.video import Video
+from open_video_summary.utils.processing.frames import FrameStore
 from open_video_summary.core.selection_criteria.base import SelectionCriteria
 from open_video_summary.handlers.summary import (
     SummarySegmentHandler,
@@ -9,8 +11,22 @@ from open_video_summary.handlers.summary import (
 
 
 class Summarizer:
-    def __init__(self, selection_criteria: list[SelectionCriteria]) -> None:
+    def __init__(
+        self,
+        selection_criteria: list[SelectionCriteria],
+        frame_store: Optional[FrameStore] = None,
+    ) -> None:
         self.selection_criteria = selection_criteria
+        self.frame_store = frame_store
+
+    def share_frame_store(self) -> None:
+        if self.frame_store is None:
+            return
+
+        for criteria in self.selection_criteria:
+            for requirement in criteria.frame_requirements():
+                self.frame_store.register(requirement)
+            criteria.frame_store = self.frame_store
 
     def summarize(
         self,
@@ -23,7 +39,14 @@ class Summarizer:
         handler = SummarySegmentHandler()
         handler.set_source_videos(videos)
 
-        handler = reduce(lambda h, c: c.evaluate(h), self.selection_criteria, handler)
+        self.share_frame_store()
+        try:
+            handler = reduce(
+                lambda h, c: c.evaluate(h), self.selection_criteria, handler
+            )
+        finally:
+            if self.frame_store is not None:
+                self.frame_store.clear()
 
         if save_output:
             SummarySegmentHandlerIO.save(handler, handler_output_path)
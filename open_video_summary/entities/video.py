@@ -1,12 +1,18 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Any, Optional
 from datetime import timedelta
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 
+IDENTITY_FIELDS = frozenset({"video_path", "order", "start", "end"})
 
-@dataclass
-class VideoSegment:
+
+class CachedHash:
+    __slots__ = ("_hash",)
+
+
+@dataclass(slots=True, eq=False)
+class VideoSegment(CachedHash):
     content: str
     start: float
     end: float
@@ -30,31 +36,41 @@ class VideoSegment:
     def formatted_end(self) -> str:
         return str(timedelta(seconds=self.end))
 
+    @property
+    def identity(self) -> tuple[str, Optional[int], float, float]:
+        return (self.video_path, self.order, self.start, self.end)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        if name in IDENTITY_FIELDS:
+            object.__setattr__(self, "_hash", None)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # The cached hash is left out, string hashes differ between processes
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "_hash", None)
+
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, VideoSegment):
             return False
-        return (
-            self.content == other.content
-            and self.start == other.start
-            and self.end == other.end
-            and self.order == other.order
+        return self is other or (
+            self.identity == other.identity
             and self.video_topic == other.video_topic
             and self.global_topic == other.global_topic
-            and self.video_path == other.video_path
+            and self.content == other.content
         )
 
-    def __hash__(self):
-        return hash(
-            (
-                self.content,
-                self.start,
-                self.end,
-                self.order,
-                self.video_topic,
-                self.global_topic,
-                self.video_path,
-            )
-        )
+    def __hash__(self) -> int:
+        # Hashing only the identity fields avoids hashing the whole content
+        cached = getattr(self, "_hash", None)
+        if cached is None:
+            cached = hash(self.identity)
+            object.__setattr__(self, "_hash", cached)
+        return cached
 
 
 @dataclass
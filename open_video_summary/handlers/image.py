@@ -1,27 +1,75 @@
-from numpy import argsort, dot, transpose
+from threading import local
+
+from numpy import arange, array, count_nonzero, dot, einsum, ndarray
+from cv2 import BFMatcher, FlannBasedMatcher, NORM_L2
+
 from open_video_summary.entities.image import Keyframe
 
+# Descriptor matchers are created once per worker thread
+matchers = local()
+
 
 class KeyframeHandler:
     @staticmethod
-    def num_matches(kf: Keyframe, other: Keyframe, threshold: float = 0.95) -> int:
-        num_match = 0
-        d1_t, d2_t = map(transpose, (kf.descriptor, other.descriptor))
+    def num_matches(
+        kf: Keyframe, other: Keyframe, threshold: float = 0.95, matcher: str = "dot"
+    ) -> int:
+        """Counts mutual nearest-neighbour descriptors with similarity >= threshold.
 
-        for i, desc in enumerate(kf.descriptor):
-            sim = dot(desc, d2_t)
-            self_match = argsort(-sim)[0]
+        The "dot" matcher finds neighbours by dot product, while "bf" and "flann"
+        find them by L2 distance with OpenCV matchers.
+        """
+        if matcher == "dot":
+            return KeyframeHandler.num_dot_matches(kf, other, threshold)
 
-            if sim[self_match] >= threshold:
-                match_feature = other.descriptor[self_match]
-                sim_check = dot(match_feature, d1_t)
-                other_match = argsort(-sim_check)[0]
+        query, train = KeyframeHandler.mutual_matches(
+            kf.descriptor, other.descriptor, matcher
+        )
+        similarity = einsum("ij,ij->i", kf.descriptor[query], other.descriptor[train])
+        return int(count_nonzero(similarity >= threshold))
+
+    @staticmethod
+    def num_dot_matches(kf: Keyframe, other: Keyframe, threshold: float) -> int:
+        similarity = dot(kf.descriptor, other.descriptor.T)
+        rows = arange(len(kf.descriptor))
 
-                num_match += (sim_check[other_match] >= threshold) and (
-                    other_match == i
-                )
+        # Best match of each descriptor, and the best match of that one back
+        self_match = similarity.argmax(axis=1)
+        other_match = similarity.argmax(axis=0)[self_match]
+
+        return int(
+            count_nonzero(
+                (similarity[rows, self_match] >= threshold) & (other_match == rows)
+            )
+        )
+
+    @staticmethod
+    def mutual_matches(
+        descriptor: ndarray, other: ndarray, matcher: str
+    ) -> tuple[ndarray, ndarray]:
+        if matcher == "bf":
+            if not hasattr(matchers, "bf"):
+                matchers.bf = BFMatcher(NORM_L2, crossCheck=True)
+            matches = matchers.bf.match(descriptor, other)
+        elif matcher == "flann":
+            if not hasattr(matchers, "flann"):
+                matchers.flann = FlannBasedMatcher()
+            backward = {
+                match.queryIdx: match.trainIdx
+                for match in matchers.flann.match(other, descriptor)
+            }
+            matches = [
+                match
+                for match in matchers.flann.match(descriptor, other)
+                if backward.get(match.trainIdx) == match.queryIdx
+            ]
+        else:
+            raise ValueError("The `matcher` must be either 'dot', 'bf' or 'flann'.")
 
-        return num_match
+        return (
+            array([match.queryIdx for match in matches], dtype=int),
+            array([match.trainIdx for match in matches], dtype=int),
+        )
 
     @staticmethod
     def is_keyframe(
@@ -29,18 +77,20 @@ class KeyframeHandler:
         keyframe_list: list[Keyframe],
         min_keypoints_diff_ratio: float = 0.6,
         min_descriptors_diff_ratio: float = 0.1,
+        matcher: str = "dot",
     ) -> bool:
         if not keyframe_list:
             return True
 
-        return sum(
+        # Stops comparing at the first keyframe too similar to the new one
+        return all(
             (
                 abs(kf.descriptor_size - kf.descriptor_size)
                 >= kf.descriptor_size * min_keypoints_diff_ratio
             )
             or (
-                KeyframeHandler.num_matches(keyframe, kf)
+                KeyframeHandler.num_matches(keyframe, kf, matcher=matcher)
                 < (min_descriptors_diff_ratio * kf.descriptor_size)
             )
             for kf in keyframe_list
-        ) == len(keyframe_list)
+        )
@@ -16,6 +16,20 @@ class SummarySegmentHandler:
     __to_pick: list[set[VideoSegment]] = field(default_factory=list)
     __agent_log: dict[str, SummaryLog] = field(default_factory=dict)
 
+    def __post_init__(self) -> None:
+        # Compact segment ids and membership indexes, kept out of the serialized fields
+        self.__segment_ids: dict[VideoSegment, int] = {}
+        self.__output_ids: set[int] = set()
+        self.__include_ids: set[int] = set()
+        self.__discard_ids: set[int] = set()
+
+        for video in self.__source_videos:
+            for segment in video.segments:
+                self.segment_id(segment)
+        self.__output_ids.update(map(self.segment_id, self.__output))
+        self.__include_ids.update(map(self.segment_id, self.__to_include))
+        self.__discard_ids.update(map(self.segment_id, self.__to_discard))
+
     @property
     def source(self) -> list[Video]:
         return self.__source_videos
@@ -40,6 +54,31 @@ class SummarySegmentHandler:
     def agent_logs(self) -> dict[str, SummaryLog]:
         return self.__agent_log
 
+    def segment_id(self, segment: VideoSegment) -> int:
+        segment_id = self.__segment_ids.get(segment)
+        if segment_id is None:
+            segment_id = self.__segment_ids[segment] = len(self.__segment_ids)
+        return segment_id
+
+    def is_output(self, segment: VideoSegment) -> bool:
+        return self.__segment_ids.get(segment) in self.__output_ids
+
+    def is_included(self, segment: VideoSegment) -> bool:
+        return self.__segment_ids.get(segment) in self.__include_ids
+
+    def is_discarded(self, segment: VideoSegment) -> bool:
+        return self.__segment_ids.get(segment) in self.__discard_ids
+
+    def __remove_included(self, segment_id: int, segment: VideoSegment) -> None:
+        if segment_id in self.__include_ids:
+            self.__include_ids.remove(segment_id)
+            self.__to_include.discard(segment)
+
+    def __remove_discarded(self, segment_id: int, segment: VideoSegment) -> None:
+        if segment_id in self.__discard_ids:
+            self.__discard_ids.remove(segment_id)
+            self.__to_discard.discard(segment)
+
     def __log_agent_action(
         self,
         action: str,
@@ -58,30 +97,41 @@ class SummarySegmentHandler:
             raise ValueError(error_msg)
 
         self.__source_videos = videos
+        for video in videos:
+            for segment in video.segments:
+                self.segment_id(segment)
         log.info("Source videos set.")
 
     def add_output_segment(self, segment: VideoSegment, agent: str) -> None:
-        if segment in self.__output:
+        if self.is_output(segment):
             log.info("Segment is already in output.")
             return
+        segment_id = self.segment_id(segment)
         self.__output.append(segment)
-        self.__to_discard.discard(segment)
-        self.__to_include.discard(segment)
+        self.__output_ids.add(segment_id)
+        self.__remove_discarded(segment_id, segment)
+        self.__remove_included(segment_id, segment)
         self.__log_agent_action("output", agent, segment)
         log.info("Added video segment to output.")
 
     def include_segment(self, segment: VideoSegment, agent: str) -> None:
-        self.__to_discard.discard(segment)
-        self.__to_include.add(segment)
+        segment_id = self.segment_id(segment)
+        self.__remove_discarded(segment_id, segment)
+        if segment_id not in self.__include_ids:
+            self.__include_ids.add(segment_id)
+            self.__to_include.add(segment)
         self.__log_agent_action("include", agent, segment)
         log.info("Added video segment to 'include' set.")
 
     def discard_segment(self, segment: VideoSegment, agent: str) -> None:
-        if segment in self.__output:
+        if self.is_output(segment):
             log.info("Can't discard segment already in output.")
             return
-        self.__to_include.discard(segment)
-        self.__to_discard.add(segment)
+        segment_id = self.segment_id(segment)
+        self.__remove_included(segment_id, segment)
+        if segment_id not in self.__discard_ids:
+            self.__discard_ids.add(segment_id)
+            self.__to_discard.add(segment)
         self.__log_agent_action("discard", agent, segment)
         log.info("Added video segment to 'discard' set.")
 
@@ -4,8 +4,6 @@ from pathlib import Path
 from json import load, dump
 from dacite import from_dict
 from dataclasses import asdict
-from moviepy.video.fx import FadeIn, FadeOut
-from moviepy import VideoFileClip, concatenate_videoclips
 
 from open_video_summary.entities.video import Video
 from open_video_summary.utils.config import PROJECT_DIR
@@ -80,6 +78,9 @@ class SummaryWriter:
     def write_video_summary(
         video: Video, fadein_seconds: float = 0.5, fadeout_seconds: float = 0.5
     ) -> None:
+        from moviepy.video.fx import FadeIn, FadeOut
+        from moviepy import VideoFileClip, concatenate_videoclips
+
         fadein_fx = FadeIn(duration=fadein_seconds)
         fadeout_fx = FadeOut(duration=fadeout_seconds)
 
@@ -1,5 +1,41 @@
-from numpy import ndarray
+from numpy import exp, log, ndarray
 
 
-def custom_cosine(v1: ndarray, v2: ndarray) -> float:
-    return sum(v1[i] * v2[i] for i in range(len(v1)))
+def softmax(logits: ndarray, axis: int = -1) -> ndarray:
+    shifted = exp(logits - logits.max(axis=axis, keepdims=True))
+    return shifted / shifted.sum(axis=axis, keepdims=True)
+
+
+def log_softmax(logits: ndarray, axis: int = -1) -> ndarray:
+    shifted = logits - logits.max(axis=axis, keepdims=True)
+    return shifted - log(exp(shifted).sum(axis=axis, keepdims=True))
+
+
+class UnionFind:
+    """Disjoint sets over the integer ids `0..size - 1`."""
+
+    def __init__(self, size: int) -> None:
+        self.parent = list(range(size))
+        self.rank = [0] * size
+
+    def find(self, item: int) -> int:
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+
+        # Path compression
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+
+        return root
+
+    def union(self, item_a: int, item_b: int) -> int:
+        root_a, root_b = self.find(item_a), self.find(item_b)
+        if root_a == root_b:
+            return root_a
+
+        if self.rank[root_a] < self.rank[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.rank[root_a] += self.rank[root_a] == self.rank[root_b]
+        return root_a
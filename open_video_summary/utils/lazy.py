@@ -0,0 +1,24 @@
+from threading import Lock
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyModel(Generic[T]):
+    """Builds a model with `factory` on first use and reuses it afterwards."""
+
+    def __init__(self, factory: Callable[[], T]) -> None:
+        self.__factory = factory
+        self.__model: Optional[T] = None
+        self.__lock = Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.__model is not None
+
+    def get(self) -> T:
+        if self.__model is None:
+            with self.__lock:
+                if self.__model is None:
+                    self.__model = self.__factory()
+        return self.__model
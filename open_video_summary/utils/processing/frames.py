@@ -0,0 +1,272 @@
+from math import gcd
+from pathlib import Path
+from hashlib import sha1
+from typing import Optional
+from threading import RLock
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from numpy import asarray, empty, flatnonzero, load, ndarray, save, uint8
+from cv2 import (
+    cvtColor,
+    VideoCapture,
+    CAP_PROP_FPS,
+    COLOR_BGR2GRAY,
+    CAP_PROP_FRAME_COUNT,
+)
+
+from open_video_summary.utils import log
+
+
+@dataclass(frozen=True)
+class FrameRequirement:
+    target_fps: int | float = 1
+    grayscale: bool = False
+
+
+@dataclass
+class DecodedVideo:
+    source_fps: int
+    duration: float
+    frames_interval: int
+    indices: ndarray
+    frames: ndarray = field(repr=False)
+    spill_path: Optional[str] = field(default=None)
+
+    @property
+    def nbytes(self) -> int:
+        if self.spill_path is not None:
+            return 0
+        return self.frames.nbytes
+
+
+class FrameStore:
+    """Decodes every source video once and serves frame views to all criteria.
+
+    Videos are decoded at the smallest frame interval required by the registered
+    `FrameRequirement`s, so each request keyed by (video_path, second range, fps,
+    color mode) is an exact subset of the decoded frames. Decoded videos are kept
+    in a LRU cache limited by `max_memory_bytes`; evicted entries are dropped or,
+    if `spill_dir` is set, saved to disk and memory-mapped back on later requests.
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+    ) -> None:
+        self.max_memory_bytes = max_memory_bytes
+        self.spill_dir = spill_dir
+        self.__requirements: set[FrameRequirement] = set()
+        self.__decoded: OrderedDict[tuple[str, bool], DecodedVideo] = OrderedDict()
+        self.__lock = RLock()
+
+    @property
+    def requirements(self) -> set[FrameRequirement]:
+        return self.__requirements
+
+    @property
+    def memory_usage(self) -> int:
+        return sum(entry.nbytes for entry in self.__decoded.values())
+
+    @property
+    def decode_grayscale(self) -> bool:
+        return all(req.grayscale for req in self.__requirements)
+
+    def register(self, requirement: FrameRequirement) -> None:
+        self.__requirements.add(requirement)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__clear()
+
+    def __clear(self) -> None:
+        for entry in self.__decoded.values():
+            if entry.spill_path is not None:
+                Path(entry.spill_path).unlink(missing_ok=True)
+        self.__decoded.clear()
+
+    def retrieve(
+        self,
+        video_path: str,
+        target_fps: int | float = 1,
+        grayscale: bool = False,
+        start_second: int | float = 0,
+        end_second: Optional[int | float] = None,
+    ) -> list:
+        # Criteria may request frames from several threads at once
+        with self.__lock:
+            return self.__retrieve(
+                video_path, target_fps, grayscale, start_second, end_second
+            )
+
+    def __retrieve(
+        self,
+        video_path: str,
+        target_fps: int | float,
+        grayscale: bool,
+        start_second: int | float,
+        end_second: Optional[int | float],
+    ) -> list:
+        self.register(FrameRequirement(target_fps, grayscale))
+
+        entry = self.__get_entry(video_path, grayscale)
+        frames_interval = max(int(entry.source_fps / target_fps), 1)
+
+        if frames_interval % entry.frames_interval != 0:
+            log.warning(
+                f"Decoded frames of video {video_path} do not cover {target_fps} fps, "
+                "decoding it again."
+            )
+            self.__drop(video_path)
+            entry = self.__get_entry(video_path, grayscale)
+
+        end_second = end_second or entry.duration
+
+        # Decoded indices are sorted, so the second range is found by bisection
+        first = entry.indices.searchsorted(start_second * entry.source_fps, "left")
+        last = entry.indices.searchsorted(end_second * entry.source_fps, "right")
+        positions = first + flatnonzero(
+            entry.indices[first:last] % frames_interval == 0
+        )
+        return [entry.frames[position] for position in positions]
+
+    def __get_entry(self, video_path: str, grayscale: bool) -> DecodedVideo:
+        key = (video_path, grayscale)
+        if key in self.__decoded:
+            self.__decoded.move_to_end(key)
+            return self.__decoded[key]
+
+        source_key = (video_path, self.decode_grayscale)
+        if source_key in self.__decoded:
+            self.__decoded.move_to_end(source_key)
+            source = self.__decoded[source_key]
+        else:
+            source = self.__decode(video_path)
+            self.__insert(source_key, source)
+
+        if key == source_key:
+            return source
+
+        # Deriving grayscale frames from the color decoding instead of decoding again
+        log.info(f"Converting decoded frames from video {video_path} to grayscale.")
+        entry = DecodedVideo(
+            source_fps=source.source_fps,
+            duration=source.duration,
+            frames_interval=source.frames_interval,
+            indices=source.indices,
+            frames=self.to_grayscale(source.frames),
+        )
+        self.__insert(key, entry)
+        return entry
+
+    def __decode(self, video_path: str) -> DecodedVideo:
+        video = VideoCapture(video_path)
+        source_fps = int(video.get(CAP_PROP_FPS))
+        total_frames = int(video.get(CAP_PROP_FRAME_COUNT))
+
+        # Greatest interval that still contains every requested sampling interval
+        frames_interval = 0
+        for req in self.__requirements or {FrameRequirement()}:
+            frames_interval = gcd(
+                frames_interval, max(int(source_fps / req.target_fps), 1)
+            )
+
+        log.info(
+            f"Decoding video {video_path} once every {frames_interval} frames for "
+            f"{len(self.__requirements)} frame requirements."
+        )
+
+        # Frames are written into one preallocated array instead of stacking a list,
+        # which would hold every frame twice at the end of the decoding
+        capacity = total_frames // frames_interval + 1
+        indices: list[int] = []
+        frames = empty((0,), dtype=uint8)
+        frame, success = -1, True
+        while success:
+            success, img = video.read()
+            if not success:
+                break
+
+            frame += 1
+            if frame % frames_interval != 0:
+                continue
+
+            if self.decode_grayscale:
+                img = cvtColor(img, COLOR_BGR2GRAY)
+
+            if not indices:
+                frames = empty((capacity, *img.shape), dtype=img.dtype)
+            elif len(indices) == len(frames):
+                # The container's frame count is only an estimate
+                frames.resize((2 * len(frames), *img.shape), refcheck=False)
+
+            frames[len(indices)] = img
+            indices.append(frame)
+
+        video.release()
+        if indices:
+            frames.resize((len(indices), *frames.shape[1:]), refcheck=False)
+
+        return DecodedVideo(
+            source_fps=source_fps,
+            duration=total_frames / source_fps,
+            frames_interval=frames_interval,
+            indices=asarray(indices, dtype=int),
+            frames=frames,
+        )
+
+    @staticmethod
+    def to_grayscale(frames: ndarray) -> ndarray:
+        if not len(frames):
+            return frames
+
+        grayscale = empty(frames.shape[:3], dtype=frames.dtype)
+        for position, frame in enumerate(frames):
+            grayscale[position] = cvtColor(frame, COLOR_BGR2GRAY)
+        return grayscale
+
+    def __insert(self, key: tuple[str, bool], entry: DecodedVideo) -> None:
+        self.__decoded[key] = entry
+        self.__decoded.move_to_end(key)
+
+        if self.max_memory_bytes is None:
+            return
+
+        # An entry larger than the whole budget is spilled or served uncached
+        if entry.nbytes > self.max_memory_bytes:
+            log.warning(
+                f"Decoded frames of video {key[0]} take {entry.nbytes} bytes, over "
+                f"the {self.max_memory_bytes} bytes memory budget."
+            )
+
+        for lru_key in list(self.__decoded.keys()):
+            if self.memory_usage <= self.max_memory_bytes:
+                break
+            self.__evict(lru_key)
+
+    def __evict(self, key: tuple[str, bool]) -> None:
+        entry = self.__decoded[key]
+        if entry.spill_path is not None:
+            return
+
+        if self.spill_dir is None or not len(entry.frames):
+            log.info(f"Evicting decoded frames of video {key[0]} from memory.")
+            del self.__decoded[key]
+            return
+
+        spill_path = (
+            Path(self.spill_dir) / f"{sha1(repr(key).encode()).hexdigest()}.npy"
+        )
+        spill_path.parent.mkdir(parents=True, exist_ok=True)
+
+        log.info(f"Spilling decoded frames of video {key[0]} to {spill_path}.")
+        save(spill_path, entry.frames)
+        entry.frames = load(spill_path, mmap_mode="r")
+        entry.spill_path = spill_path.as_posix()
+
+    def __drop(self, video_path: str) -> None:
+        for key in [key for key in self.__decoded if key[0] == video_path]:
+            entry = self.__decoded.pop(key)
+            if entry.spill_path is not None:
+                Path(entry.spill_path).unlink(missing_ok=True)
@@ -1,8 +1,28 @@
-from math import log10
-from pandas import DataFrame
-from collections import Counter
-from sklearn.cluster import KMeans  # type: ignore
-from numpy import concatenate
+from __future__ import annotations
+
+from pathlib import Path
+from pandas import DataFrame, Index
+from typing import Iterable, Optional
+from itertools import islice
+from threading import local
+from numpy.random import default_rng
+from sklearn.cluster import KMeans, MiniBatchKMeans  # type: ignore
+from numpy import (
+    bincount,
+    concatenate,
+    count_nonzero,
+    einsum,
+    empty,
+    float32,
+    float64,
+    load,
+    log10,
+    minimum,
+    ndarray,
+    save,
+    stack,
+    zeros,
+)
 from cv2 import (
     calcHist,
     normalize,
@@ -17,63 +37,180 @@ from open_video_summary.entities.image import Keyframe
 from open_video_summary.entities.video import VideoSegment
 from open_video_summary.handlers.image import KeyframeHandler
 
+# SIFT extractors are created once per worker thread
+extractors = local()
+
+
+class VisualVocabulary:
+    """Codebook of visual words, fitted with KMeans or MiniBatchKMeans.
+
+    Fitting uses at most `max_descriptors` randomly sampled descriptors. A
+    fitted codebook can be saved to and loaded from a `.npy` file, so it can be
+    shared between clusters and runs.
+    """
+
+    def __init__(
+        self,
+        dict_size: int = 300,
+        method: str = "kmeans",
+        max_descriptors: Optional[int] = None,
+        random_state: int = 0,
+    ) -> None:
+        if method not in {"kmeans", "minibatch"}:
+            raise ValueError("The `method` must be either 'kmeans' or 'minibatch'.")
+
+        self.dict_size = dict_size
+        self.method = method
+        self.max_descriptors = max_descriptors
+        self.random_state = random_state
+        self.__codebook: Optional[ndarray] = None
+
+    @property
+    def fitted(self) -> bool:
+        return self.__codebook is not None
+
+    @property
+    def codebook(self) -> ndarray:
+        if self.__codebook is None:
+            raise ValueError("Visual vocabulary has not been fitted.")
+        return self.__codebook
+
+    def fit(self, descriptors: ndarray, **kwargs) -> VisualVocabulary:
+        max_descriptors = self.max_descriptors
+        if max_descriptors is not None and len(descriptors) > max_descriptors:
+            sample = default_rng(self.random_state).choice(
+                len(descriptors), size=max_descriptors, replace=False
+            )
+            descriptors = descriptors[sample]
+
+        if not len(descriptors):
+            raise ValueError("No descriptors to fit the visual vocabulary.")
+
+        # Segment-scoped features may have fewer descriptors than visual words
+        n_clusters = min(self.dict_size, len(descriptors))
+        kmeans_class = MiniBatchKMeans if self.method == "minibatch" else KMeans
+
+        log.info(f"Fitting {kmeans_class.__name__} on {len(descriptors)} descriptors...")
+        kmeans = kmeans_class(
+            n_clusters=n_clusters, random_state=self.random_state, **kwargs
+        )
+        kmeans.fit(descriptors)
+
+        self.__codebook = kmeans.cluster_centers_
+        return self
+
+    def predict(self, descriptors: ndarray) -> ndarray:
+        codebook = self.codebook
+
+        # Nearest visual word by squared euclidean distance, without the constant |x|²
+        distances = (
+            einsum("ij,ij->i", codebook, codebook) - 2 * descriptors @ codebook.T
+        )
+        return distances.argmin(axis=1)
+
+    def save(self, path: str) -> None:
+        log.info(f"Saving visual vocabulary to {path}.")
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        save(path, self.codebook)
+
+    @classmethod
+    def load(cls, path: str) -> VisualVocabulary:
+        log.info(f"Loading visual vocabulary from {path}.")
+        codebook = load(path)
+        vocabulary = cls(dict_size=len(codebook))
+        vocabulary.__codebook = codebook
+        return vocabulary
+
 
 class BagOfVisualWords:
-    def __init__(self, items: dict[VideoSegment, list], dict_size: int) -> None:
+    def __init__(
+        self,
+        items: dict[VideoSegment, ndarray],
+        dict_size: int,
+        vocabulary: Optional[VisualVocabulary] = None,
+    ) -> None:
         self.__items = items
         self.__dict_size = dict_size
-        self.__kmeans = None
-        self.__bovw_df = None
+        self.__vocabulary = vocabulary or VisualVocabulary(dict_size=dict_size)
+        self.__bovw_df: Optional[DataFrame] = None
 
     def fit_kmeans(self, **kwargs) -> None:
-        self.__kmeans = KMeans(n_clusters=self.__dict_size, **kwargs)
-        if self.__kmeans is None:
-            raise ValueError("KMeans instance is not initialized.")
-
-        log.info("Fitting KMeans...")
-        self.__kmeans.fit(concatenate(list(self.__items.values())))
+        if self.__vocabulary.fitted:
+            log.info("Using visual vocabulary already fitted.")
+            return
 
-    def generate_bovw_dataframe(self) -> DataFrame:
-        if self.__kmeans is None:
-            raise ValueError("KMeans has not been fitted.")
+        self.__vocabulary.fit(concatenate(list(self.__items.values())), **kwargs)
 
-        self.__bovw_df = DataFrame(
-            self.__items.items(), columns=["segment", "features"]
-        )
+    def generate_bovw_matrix(self) -> tuple[list[VideoSegment], ndarray, ndarray]:
+        """TF-IDF weighted visual words histograms, one row per segment.
 
-        tfs = self.__bovw_df.features.apply(self.__kmeans.predict).apply(Counter)
-        doc_freq = Counter(key for a in tfs for key in a.keys())
+        Returns the segments, the histograms and the visual word of each column.
+        Only visual words present in at least one segment get a column.
+        """
+        if not self.__vocabulary.fitted:
+            raise ValueError("KMeans has not been fitted.")
 
-        for key in doc_freq.keys():
-            term_freq = tfs.apply(lambda x: x.get(key))
-            term_idf = log10(self.__dict_size / doc_freq.get(key))
+        num_words = len(self.__vocabulary.codebook)
+        segments = list(self.__items.keys())
+        term_freq = zeros((len(segments), num_words), dtype=float64)
+        for row, features in enumerate(self.__items.values()):
+            if len(features):
+                term_freq[row] = bincount(
+                    self.__vocabulary.predict(features), minlength=num_words
+                )
 
-            new_df = self.__bovw_df.copy()
-            new_df[key] = term_freq * term_idf
-            self.__bovw_df = new_df
+        doc_freq = count_nonzero(term_freq, axis=0)
+        words = doc_freq.nonzero()[0]
+        term_idf = log10(self.__dict_size / doc_freq[words])
 
-        self.__bovw_df.drop(columns=["features"], inplace=True)
-        self.__bovw_df.set_index("segment", drop=True, inplace=True)
+        return segments, term_freq[:, words] * term_idf, words
 
-        return self.__bovw_df
+    def generate_bovw_dataframe(self) -> DataFrame:
+        segments, histograms, words = self.generate_bovw_matrix()
+        bovw_df = DataFrame(
+            histograms, index=Index(segments, name="segment"), columns=words
+        )
+        self.__bovw_df = bovw_df
+        return bovw_df
 
 
 class ImageProcessor:
     @staticmethod
-    def ks_sift(frames: list):
+    def ks_sift(frames: Iterable, matcher: str = "dot"):
+        sift = ImageProcessor.sift_extractor()
+
         segment_keyframes: list[Keyframe] = []
-        for frame in frames[1:-1]:
-            _, descriptor = SIFT_create().detectAndCompute(frame, None)
+        for frame in ImageProcessor.inner_frames(frames):
+            _, descriptor = sift.detectAndCompute(frame, None)
 
             if descriptor is None:
                 continue
 
             keyframe = Keyframe(descriptor=descriptor)
-            if KeyframeHandler.is_keyframe(keyframe, segment_keyframes):
+            if KeyframeHandler.is_keyframe(
+                keyframe, segment_keyframes, matcher=matcher
+            ):
                 segment_keyframes.append(keyframe)
 
+        if not segment_keyframes:
+            return empty((0, sift.descriptorSize()), dtype=float32)
         return concatenate([kf.descriptor for kf in segment_keyframes])
 
+    @staticmethod
+    def sift_extractor():
+        if not hasattr(extractors, "sift"):
+            extractors.sift = SIFT_create()
+        return extractors.sift
+
+    @staticmethod
+    def inner_frames(frames: Iterable) -> Iterable:
+        """Lazily yields every frame except the first and the last ones."""
+        previous = None
+        for position, frame in enumerate(islice(frames, 1, None)):
+            if position:
+                yield previous
+            previous = frame
+
     @staticmethod
     def get_frame_histogram(frame):
         histogram = calcHist([frame], [0], None, [256], [0, 256])
@@ -83,3 +220,20 @@ class ImageProcessor:
     @staticmethod
     def compare_histograms(hist_1, hist_2):
         return compareHist(hist_1, hist_2, HISTCMP_INTERSECT)
+
+    @staticmethod
+    def histogram_intersections(frames: list[ndarray]) -> ndarray:
+        """Histogram intersections of every pair of consecutive frames at once.
+
+        Like `get_frame_histogram`, only the first channel of color frames is used.
+        """
+        if len(frames) < 2:
+            return empty(0, dtype=float64)
+
+        channels = [frame if frame.ndim == 2 else frame[..., 0] for frame in frames]
+        histograms = stack(
+            [bincount(channel.ravel(), minlength=256) for channel in channels]
+        ).astype(float64)
+        histograms /= histograms.sum(axis=1, keepdims=True)
+
+        return minimum(histograms[:-1], histograms[1:]).sum(axis=1)
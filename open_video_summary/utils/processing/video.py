@@ -1,12 +1,17 @@
-from typing import Optional
+from typing import Generator, Optional
+from numpy import ndarray
 from cv2 import (
     cvtColor,
     VideoCapture,
     CAP_PROP_FPS,
     COLOR_BGR2GRAY,
+    CAP_PROP_POS_MSEC,
+    CAP_PROP_POS_FRAMES,
     CAP_PROP_FRAME_COUNT,
 )
 
+from open_video_summary.utils import log
+
 
 class VideoProcessor:
     @staticmethod
@@ -16,14 +21,99 @@ class VideoProcessor:
         grayscale: bool = False,
         start_second: int | float = 0,
         end_second: Optional[int | float] = None,
+        seek: bool = False,
     ) -> list:
+        return list(
+            VideoProcessor.iter_video_frames(
+                video_path,
+                target_fps=target_fps,
+                grayscale=grayscale,
+                start_second=start_second,
+                end_second=end_second,
+                seek=seek,
+            )
+        )
+
+    @staticmethod
+    def iter_video_frames(
+        video_path: str,
+        target_fps: int | float = 1,
+        grayscale: bool = False,
+        start_second: int | float = 0,
+        end_second: Optional[int | float] = None,
+        seek: bool = False,
+    ) -> Generator[ndarray, None, None]:
         video = VideoCapture(video_path)
-        source_fps = int(video.get(CAP_PROP_FPS))
-        total_frames = int(video.get(CAP_PROP_FRAME_COUNT))
-        end_second = end_second or (total_frames / source_fps)
+        try:
+            source_fps = int(video.get(CAP_PROP_FPS))
+            total_frames = int(video.get(CAP_PROP_FRAME_COUNT))
+            end_second = end_second or (total_frames / source_fps)
+            frames_interval = int(source_fps / target_fps)
+
+            first_frame = VideoProcessor.first_sampled_frame(
+                source_fps, frames_interval, start_second
+            )
+            if seek and VideoProcessor.seek_frame(video, first_frame):
+                yield from VideoProcessor.sparse_frames(
+                    video,
+                    source_fps,
+                    frames_interval,
+                    first_frame,
+                    end_second,
+                    grayscale,
+                )
+            else:
+                yield from VideoProcessor.linear_frames(
+                    video,
+                    source_fps,
+                    frames_interval,
+                    start_second,
+                    end_second,
+                    grayscale,
+                )
+        finally:
+            # Also reached when the consumer stops iterating early
+            video.release()
+
+    @staticmethod
+    def first_sampled_frame(
+        source_fps: int, frames_interval: int, start_second: int | float
+    ) -> int:
+        frame = int(start_second * source_fps)
+        while (frame / source_fps) < start_second:
+            frame += 1
+        return -(-frame // frames_interval) * frames_interval
+
+    @staticmethod
+    def seek_frame(video: VideoCapture, frame: int) -> bool:
+        """Seeks to `frame` and grabs it, so it's the next one to be retrieved."""
+        if frame == 0:
+            return video.grab()
 
-        frames = []
-        frames_interval = int(source_fps / target_fps)
+        # Some containers land on the closest keyframe instead of the requested
+        # frame while still reporting the requested position, so the timestamp of
+        # the grabbed frame is checked instead
+        fps = video.get(CAP_PROP_FPS)
+        if (
+            video.set(CAP_PROP_POS_FRAMES, frame)
+            and video.grab()
+            and abs(video.get(CAP_PROP_POS_MSEC) - 1000 * frame / fps) < 500 / fps
+        ):
+            return True
+
+        log.warning(f"Inaccurate seek to frame {frame}, falling back to linear decode.")
+        video.set(CAP_PROP_POS_FRAMES, 0)
+        return False
+
+    @staticmethod
+    def linear_frames(
+        video: VideoCapture,
+        source_fps: int,
+        frames_interval: int,
+        start_second: int | float,
+        end_second: int | float,
+        grayscale: bool,
+    ) -> Generator[ndarray, None, None]:
         frame, success = -1, True
         while success:
             success, img = video.read()
@@ -43,7 +133,34 @@ class VideoProcessor:
             if grayscale:
                 img = cvtColor(img, COLOR_BGR2GRAY)
 
-            frames.append(img)
+            yield img
+
+    @staticmethod
+    def sparse_frames(
+        video: VideoCapture,
+        source_fps: int,
+        frames_interval: int,
+        first_frame: int,
+        end_second: int | float,
+        grayscale: bool,
+    ) -> Generator[ndarray, None, None]:
+        # The first frame was already grabbed by the seek
+        frame, grabbed = first_frame, True
+        while (frame / source_fps) <= end_second:
+            # Only sampled frames are retrieved, skipped ones are just grabbed
+            if frame % frames_interval != 0:
+                if not video.grab():
+                    break
+                frame += 1
+                continue
+
+            success, img = video.retrieve() if grabbed else video.read()
+            grabbed = False
+            if not success:
+                break
 
-        video.release()
-        return frames
+            if grayscale:
+                img = cvtColor(img, COLOR_BGR2GRAY)
+
+            yield img
+            frame += 1
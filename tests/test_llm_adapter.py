@@ -0,0 +1,97 @@
+from time import sleep
+from threading import Lock
+
+import pytest
+
+from open_video_summary.utils.lazy import LazyModel
+from open_video_summary.adapters.llm import (
+    LLMPatternNotFoundError,
+    OllamaAdapter,
+    RetryPolicy,
+)
+
+
+class StubClient:
+    """Answers `generate` like an Ollama client, later prompts finishing first."""
+
+    def __init__(
+        self, num_prompts: int, failing_prompt: str = "", unmatched_prompt: str = ""
+    ) -> None:
+        self.num_prompts = num_prompts
+        self.failing_prompt = failing_prompt
+        self.unmatched_prompt = unmatched_prompt
+        self.active = 0
+        self.max_active = 0
+        self.lock = Lock()
+
+    def generate(self, model: str, prompt: str, **kwargs) -> dict:
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            sleep(0.01 * (self.num_prompts - int(prompt.split()[-1])))
+            if prompt == self.failing_prompt:
+                raise ConnectionError(f"Failed on {prompt}.")
+            if prompt == self.unmatched_prompt:
+                return {"response": "no json here"}
+            return {"response": f'noise {{"prompt": "{prompt}"}} noise'}
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def create_adapter(client: StubClient, max_concurrency: int) -> OllamaAdapter:
+    adapter = OllamaAdapter(
+        max_concurrency=max_concurrency,
+        retry_policy=RetryPolicy(
+            max_attempts=1, max_pattern_misses=2, backoff_seconds=0
+        ),
+    )
+    adapter.client = LazyModel(lambda: client)
+    return adapter
+
+
+def test_default_adapter_is_serial():
+    assert OllamaAdapter().max_concurrency == 1
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+def test_generate_pattern_many_keeps_prompt_order(max_concurrency):
+    prompts = [f"prompt {index}" for index in range(8)]
+    client = StubClient(len(prompts))
+    adapter = create_adapter(client, max_concurrency)
+
+    responses = adapter.generate_pattern_many(prompts, pattern=r"(\{.*?\})")
+
+    assert responses == [f'{{"prompt": "{prompt}"}}' for prompt in prompts]
+    assert client.max_active == max_concurrency
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+def test_generate_pattern_many_propagates_errors(max_concurrency):
+    prompts = [f"prompt {index}" for index in range(8)]
+    adapter = create_adapter(StubClient(len(prompts), "prompt 5"), max_concurrency)
+
+    with pytest.raises(ConnectionError, match="prompt 5"):
+        adapter.generate_pattern_many(prompts, pattern=r"(\{.*?\})")
+
+
+def test_generate_pattern_raises_when_nothing_matches():
+    adapter = create_adapter(StubClient(1, unmatched_prompt="prompt 0"), 1)
+
+    with pytest.raises(LLMPatternNotFoundError):
+        adapter.generate_pattern("prompt 0", pattern=r"(\{.*?\})")
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+def test_generate_pattern_many_uses_defaults_for_unmatched(max_concurrency):
+    prompts = [f"prompt {index}" for index in range(4)]
+    client = StubClient(len(prompts), unmatched_prompt="prompt 2")
+    adapter = create_adapter(client, max_concurrency)
+
+    responses = adapter.generate_pattern_many(
+        prompts, pattern=r"(\{.*?\})", defaults=["a", "b", "c", "d"]
+    )
+
+    assert responses[2] == "c"
+    assert responses[3] == '{"prompt": "prompt 3"}'
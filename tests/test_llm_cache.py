@@ -0,0 +1,122 @@
+import pytest
+
+from open_video_summary.utils.lazy import LazyModel
+from open_video_summary.adapters import cache
+from open_video_summary.adapters.cache import CachedLLMAdapter
+from open_video_summary.adapters.llm import (
+    LLMPatternNotFoundError,
+    OllamaAdapter,
+    RetryPolicy,
+)
+
+
+class StubClient:
+    """Answers `generate` like an Ollama client, counting the calls per prompt."""
+
+    def __init__(self, unmatched_prompt: str = "") -> None:
+        self.unmatched_prompt = unmatched_prompt
+        self.calls: dict[str, int] = {}
+
+    def generate(self, model: str, prompt: str, **kwargs) -> dict:
+        self.calls[prompt] = self.calls.get(prompt, 0) + 1
+        if prompt == self.unmatched_prompt:
+            return {"response": "no json here"}
+        return {"response": f'{{"prompt": "{prompt}", "call": {self.calls[prompt]}}}'}
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def create_cached_adapter(client: StubClient, **kwargs) -> CachedLLMAdapter:
+    adapter = OllamaAdapter(
+        retry_policy=RetryPolicy(max_attempts=1, max_pattern_misses=1)
+    )
+    adapter.client = LazyModel(lambda: client)
+    return CachedLLMAdapter(adapter, **kwargs)
+
+
+def test_repeated_prompts_hit_the_cache(clock):
+    client = StubClient()
+    adapter = create_cached_adapter(client)
+
+    first = adapter.generate_pattern("prompt", pattern=r"(\{.*?\})")
+    second = adapter.generate_pattern("prompt", pattern=r"(\{.*?\})")
+
+    assert first == second
+    assert client.calls == {"prompt": 1}
+    assert adapter.stats == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_keys_isolate_options_and_patterns(clock):
+    client = StubClient()
+    adapter = create_cached_adapter(client)
+
+    adapter.generate_pattern("prompt", r"(\{.*?\})", options={"temperature": 0.2})
+    adapter.generate_pattern("prompt", r"(\{.*?\})", options={"temperature": 0.5})
+    adapter.generate_pattern("prompt", r"(\{.*\})", options={"temperature": 0.2})
+    adapter.generate_pattern("prompt", r"(\{.*?\})", options={"temperature": 0.2})
+
+    assert client.calls == {"prompt": 3}
+    assert adapter.stats == {"hits": 1, "misses": 3, "entries": 3}
+
+
+def test_expired_entries_are_misses(clock):
+    client = StubClient()
+    adapter = create_cached_adapter(client, ttl_seconds=10)
+
+    adapter.generate_pattern("prompt", pattern=r"(\{.*?\})")
+    clock.now = 5
+    adapter.generate_pattern("prompt", pattern=r"(\{.*?\})")
+    clock.now = 16
+    response = adapter.generate_pattern("prompt", pattern=r"(\{.*?\})")
+
+    assert response == '{"prompt": "prompt", "call": 2}'
+    assert adapter.stats == {"hits": 1, "misses": 2, "entries": 1}
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    client = StubClient()
+    adapter = create_cached_adapter(client, max_entries=2)
+
+    for second, prompt in enumerate(["a", "b", "a", "c"]):
+        clock.now = second
+        adapter.generate_pattern(prompt, pattern=r"(\{.*?\})")
+    clock.now = 4
+    adapter.generate_pattern("a", pattern=r"(\{.*?\})")
+    adapter.generate_pattern("b", pattern=r"(\{.*?\})")
+
+    assert len(adapter) == 2
+    assert client.calls == {"a": 1, "b": 2, "c": 1}
+
+
+def test_unmatched_responses_are_not_cached(clock):
+    client = StubClient(unmatched_prompt="prompt")
+    adapter = create_cached_adapter(client)
+
+    for _ in range(2):
+        with pytest.raises(LLMPatternNotFoundError):
+            adapter.generate_pattern("prompt", pattern=r"(\{.*?\})")
+
+    assert client.calls == {"prompt": 2}
+    assert len(adapter) == 0
+
+
+def test_clear_drops_entries_and_counters(clock):
+    adapter = create_cached_adapter(StubClient())
+    adapter.generate_pattern("prompt", pattern=r"(\{.*?\})")
+
+    adapter.clear()
+
+    assert adapter.stats == {"hits": 0, "misses": 0, "entries": 0}